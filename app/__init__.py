@@ -1,6 +1,11 @@
-from flask import Flask, send_from_directory
+from flask import Flask, jsonify
+from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
-from app.extensions import init_cors
+from app.extensions import init_cors, engine, replica_engines
+from app.metrics import init_metrics
+from app.security import PasswordBusy
+from app.uploads import send_upload
+from app.serializers import json_provider_class
 from config import Settings
 import os
 
@@ -8,7 +13,11 @@ import os
 def create_app():
     load_dotenv()
     app = Flask(__name__)
+    app.json = json_provider_class()(app)
+    if Settings.PROXY_HOPS:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=Settings.PROXY_HOPS, x_proto=Settings.PROXY_HOPS)
     init_cors(app)
+    init_metrics(app, [engine, *replica_engines])
 
     from app.routes.health import bp as health_bp
     app.register_blueprint(health_bp, url_prefix="/")
@@ -22,8 +31,22 @@ def create_app():
     from app.routes.friends import bp as friends_bp
     app.register_blueprint(friends_bp, url_prefix="/")
 
+    from app.cli import cli as nexo_cli
+    app.cli.add_command(nexo_cli)
+
+    @app.errorhandler(PasswordBusy)
+    def password_busy(_e):
+        return jsonify(error="Servicio ocupado, reintente"), 503, {"Retry-After": "1"}
+
     @app.get("/uploads/<path:filename>")
     def serve_upload(filename):
-        return send_from_directory(os.path.join(os.path.dirname(__file__), "../uploads"), filename)
+        return send_upload(os.path.join(os.path.dirname(__file__), "../uploads"), filename)
 
     return app
+
+
+def init_worker():
+    """Hook post_fork de gunicorn con preload: rearma por worker lo que no se hereda del master."""
+    from app import extensions, security
+    extensions.reset_after_fork()
+    security.reset_after_fork()
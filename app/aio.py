@@ -0,0 +1,85 @@
+"""Modo ASGI: el event loop atiende las conexiones y las vistas Flask corren en un pool de hilos acotado.
+
+Las vistas siguen siendo síncronas (``scoped_session`` sobre PyMySQL): cada request en curso
+ocupa uno de los ``ASGI_THREADS`` hilos mientras espera a la BD, así que la concurrencia de
+requests sigue acotada por ese pool. El loop sí sostiene sin hilo las conexiones ociosas
+(keep-alive, clientes lentos) y los streams de ``GET /friends/events``, que se atienden aquí.
+"""
+import asyncio
+from urllib.parse import parse_qs
+from config import Settings
+
+
+async def _wait_disconnect(receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+def _cors_headers(origin: str | None) -> list[tuple[bytes, bytes]]:
+    # Mismo criterio que flask-cors con CORS_ORIGINS, que aquí no interviene.
+    if "*" in Settings.CORS_ORIGINS:
+        return [(b"access-control-allow-origin", b"*")]
+    if origin and origin in Settings.CORS_ORIGINS:
+        return [(b"access-control-allow-origin", origin.encode("latin-1")), (b"vary", b"Origin")]
+    return []
+
+
+class AsgiApp:
+    def __init__(self, flask_app):
+        from a2wsgi import WSGIMiddleware
+        self.flask_app = flask_app
+        self.wsgi = WSGIMiddleware(flask_app, workers=Settings.ASGI_THREADS)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] == "http" and scope["method"] == "GET" and scope["path"] == "/friends/events":
+            return await self._friend_events(scope, receive, send)
+        await self.wsgi(scope, receive, send)
+
+    async def _friend_events(self, scope, receive, send):
+        """SSE en el loop: una conexión abierta no ocupa un hilo de ASGI_THREADS."""
+        from app import events
+        from app.routes.friends import event_token
+        from app.security import principal_for_token
+        headers = {k.decode("latin-1").title(): v.decode("latin-1") for k, v in scope["headers"]}
+        args = {k: v[0] for k, v in parse_qs(scope["query_string"].decode("latin-1")).items()}
+        cors = _cors_headers(headers.get("Origin"))
+        token = event_token(headers, args)
+        me = await asyncio.to_thread(principal_for_token, token) if token else None
+        if not me:
+            await send({"type": "http.response.start", "status": 401,
+                        "headers": [(b"content-type", b"application/json"), *cors]})
+            await send({"type": "http.response.body", "body": b'{"error":"Unauthorized"}'})
+            return
+        last_event_id = headers.get("Last-Event-Id") or args.get("last_event_id")
+        sub, position = events.hub.subscribe(me.id, Settings.FRIEND_EVENTS_QUEUE, asyncio.get_running_loop())
+        disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+        try:
+            await send({"type": "http.response.start", "status": 200, "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no"), *cors,
+            ]})
+            body = await asyncio.to_thread(events.opening, me.id, last_event_id, position)
+            while not disconnected.done():
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+                waiter = asyncio.ensure_future(sub.await_items(Settings.FRIEND_EVENTS_HEARTBEAT_S))
+                await asyncio.wait({waiter, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                items = sub.drain()
+                if sub.overflowed:
+                    await send({"type": "http.response.body", "body": events.RESET})
+                    return
+                body = b"".join(events.render(me.id, eid, ev) for eid, ev in items) or events.HEARTBEAT
+        finally:
+            sub.close()
+            disconnected.cancel()
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
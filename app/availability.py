@@ -0,0 +1,130 @@
+import time, threading, datetime as dt
+from sqlalchemy import select, func
+from app.extensions import SessionLocal
+from app.models import User, AuthLocal
+from app.revocations import BloomFilter
+from config import Settings
+
+_COLUMNS = {"username": (User.username, User.updated_at), "email": (AuthLocal.email, AuthLocal.updated_at)}
+
+
+class TakenIndex:
+    """Usernames y emails ocupados (normalizados) en un Bloom: un "no está" es definitivo.
+
+    Sólo los posibles aciertos se confirman contra el índice único. Se arma con una consulta en
+    streaming y después trae cada AVAILABILITY_SYNC_S las filas con ``updated_at`` reciente
+    (registros, cambios de username/email e importaciones de cualquier worker), releyendo una
+    ventana de SYNC_SKEW_S. Los valores liberados salen con la reconstrucción completa cada
+    AVAILABILITY_REBUILD_S; mientras tanto sólo cuestan una consulta de confirmación.
+    """
+
+    def __init__(self, sync_interval: float, rebuild_interval: float):
+        self._bloom = None
+        self._count = 0
+        self._watermark = None
+        self._lock = threading.Lock()
+        # Las escrituras al Bloom van bajo su propio lock (``|=`` sobre el bytearray no es atómico);
+        # durante una reconstrucción las altas locales se guardan para pasarlas al filtro nuevo.
+        self._add_lock = threading.Lock()
+        self._pending: list[str] | None = None
+        self._sync_interval = sync_interval
+        self._rebuild_interval = rebuild_interval
+        self._next_sync = 0.0
+        self._next_rebuild = 0.0
+        self.db_checks = 0
+
+    def warm(self) -> None:
+        with self._lock:
+            self._refresh(time.monotonic(), rebuild=True)
+
+    def _ensure_fresh(self) -> None:
+        now = time.monotonic()
+        if now < self._next_sync:
+            return
+        with self._lock:
+            if now < self._next_sync:
+                return
+            self._refresh(now, rebuild=self._bloom is None or now >= self._next_rebuild)
+
+    def _refresh(self, now: float, rebuild: bool) -> None:
+        # Sesión propia (no la del scoped_session) para no cerrar la del request en curso.
+        with SessionLocal.session_factory() as db:
+            if rebuild:
+                users = db.scalar(select(func.count(User.id)))
+                # Dos claves por usuario y margen para crecer hasta la próxima reconstrucción.
+                # Se llena un filtro nuevo y se publica al terminar: mientras tanto se consulta el anterior.
+                bloom, count, watermark = BloomFilter(max(4 * users, 1024)), 0, self._db_now(db)
+                with self._add_lock:
+                    self._pending = []
+                try:
+                    for key in self._scan(db, None):
+                        bloom.add(key)
+                        count += 1
+                except Exception:
+                    with self._add_lock:
+                        self._pending = None
+                    raise
+                with self._add_lock:
+                    for key in self._pending:
+                        bloom.add(key)
+                    self._bloom, self._count = bloom, count + len(self._pending)
+                    self._pending = None
+                self._watermark = watermark
+                self._next_rebuild = now + self._rebuild_interval
+            else:
+                # Reloj de la BD (el mismo que escribe updated_at), tomado antes de leer.
+                watermark = self._db_now(db)
+                keys = list(self._scan(db, self._watermark - dt.timedelta(seconds=Settings.SYNC_SKEW_S)))
+                with self._add_lock:
+                    for key in keys:
+                        # La ventana se relee en cada pasada: lo ya presente no cuenta para la capacidad.
+                        if key not in self._bloom:
+                            self._bloom.add(key)
+                            self._count += 1
+                self._watermark = watermark
+        self._next_sync = now + self._sync_interval
+        if self._count > self._bloom.capacity:
+            self._next_rebuild = now
+
+    @staticmethod
+    def _db_now(db):
+        return db.scalar(select(func.now()))
+
+    @staticmethod
+    def _scan(db, since):
+        for kind, (value_col, updated_col) in _COLUMNS.items():
+            q = select(value_col)
+            if since is not None:
+                q = q.where(updated_col >= since)
+            for (value,) in db.execute(q.execution_options(yield_per=10000)):
+                yield f"{kind}:{value}"
+
+    def add(self, kind: str, value: str) -> None:
+        """Marca un valor recién tomado en este worker, sin esperar a la sincronización."""
+        key = f"{kind}:{value}"
+        with self._add_lock:
+            if self._pending is not None:
+                self._pending.append(key)
+            if self._bloom is not None and key not in self._bloom:
+                self._bloom.add(key)
+                self._count += 1
+
+    def is_taken(self, kind: str, value: str) -> bool:
+        self._ensure_fresh()
+        if f"{kind}:{value}" not in self._bloom:
+            return False
+        self.db_checks += 1
+        value_col, _ = _COLUMNS[kind]
+        with SessionLocal.session_factory() as db:
+            return db.execute(select(value_col).where(value_col == value)).first() is not None
+
+    def stats(self) -> dict:
+        return {
+            "entries": self._count,
+            "bloom_bits": self._bloom.bits if self._bloom else 0,
+            "bloom_hashes": self._bloom.hashes if self._bloom else 0,
+            "db_checks": self.db_checks,
+        }
+
+
+taken = TakenIndex(Settings.AVAILABILITY_SYNC_S, Settings.AVAILABILITY_REBUILD_S)
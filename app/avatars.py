@@ -0,0 +1,109 @@
+import os, uuid, logging, threading, datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+from flask import request
+from config import Settings
+
+log = logging.getLogger(__name__)
+
+FORMATS = {"JPEG": ".jpg", "PNG": ".png", "GIF": ".gif", "WEBP": ".webp"}
+CHUNK_SIZE = 64 * 1024
+
+_pool: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+class AvatarError(Exception):
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def store_upload(stream, max_bytes: int) -> str:
+    """Copia el archivo a disco por bloques cortando al superar ``max_bytes``; devuelve la ruta relativa."""
+    today = dt.date.today()
+    rel_dir = os.path.join(Settings.UPLOAD_ROOT, f"{today.year}", f"{today.month:02d}")
+    os.makedirs(rel_dir, exist_ok=True)
+    name = str(uuid.uuid4())
+    tmp_path = os.path.join(rel_dir, name + ".part")
+    written = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            while chunk := stream.read(CHUNK_SIZE):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise AvatarError("Archivo excede tamaño máximo", 413)
+                out.write(chunk)
+        rel_path = os.path.join(rel_dir, name + _validate(tmp_path))
+        os.replace(tmp_path, rel_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return rel_path.replace("\\", "/")
+
+
+def _validate(path: str) -> str:
+    # Pillow se importa al usarse: sólo lo necesitan las subidas, no el arranque de cada worker.
+    from PIL import Image, UnidentifiedImageError
+    try:
+        with Image.open(path) as img:
+            fmt = img.format
+            img.verify()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        raise AvatarError("Imagen inválida", 422)
+    if fmt not in FORMATS:
+        raise AvatarError("Formato no permitido", 422)
+    return FORMATS[fmt]
+
+
+def variant_path(path: str, size: int) -> str:
+    return f"{os.path.splitext(path)[0]}_{size}.webp"
+
+
+def _make_variants(path: str) -> None:
+    from PIL import Image, ImageOps
+    with Image.open(path) as img:
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+        for size in Settings.AVATAR_SIZES:
+            dst = variant_path(path, size)
+            tmp = dst + ".part"
+            ImageOps.fit(img, (size, size), Image.Resampling.LANCZOS).save(tmp, "WEBP", quality=82, method=4)
+            os.replace(tmp, dst)
+
+
+def _log_failure(future) -> None:
+    if future.exception():
+        log.error("No se pudieron generar variantes de avatar", exc_info=future.exception())
+
+
+def schedule_variants(path: str) -> None:
+    """Genera las variantes WebP fuera del request."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=Settings.AVATAR_WORKERS, thread_name_prefix="avatars")
+    _pool.submit(_make_variants, path).add_done_callback(_log_failure)
+
+
+def requested_avatar_size() -> int | None:
+    try:
+        return int(request.args["avatar_size"])
+    except (KeyError, ValueError):
+        return None
+
+
+def avatar_url(path: str | None, size: int | None = None) -> str | None:
+    """URL del avatar; con ``size`` usa la variante más chica que lo cubra, si ya fue generada."""
+    if not path:
+        return None
+    if size:
+        for s in Settings.AVATAR_SIZES:
+            if s >= size:
+                candidate = variant_path(path, s)
+                if os.path.exists(candidate):
+                    return f"/{candidate}"
+                break
+    return f"/{path}"
@@ -0,0 +1,88 @@
+import threading, time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """LRU acotado por cantidad de entradas, con vencimiento por entrada. Seguro entre hilos."""
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] <= time.time():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value, expires_at: float | None = None) -> None:
+        if expires_at is None:
+            expires_at = time.time() + self.ttl if self.ttl else float("inf")
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+class ByteLRU:
+    """LRU de blobs acotado por el total de bytes almacenados."""
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, data: bytes, meta=None) -> None:
+        """Guarda ``(data, meta)``; sólo ``data`` cuenta contra el presupuesto."""
+        if len(data) > self.budget:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.used -= len(old[0])
+            self._data[key] = (data, meta)
+            self.used += len(data)
+            while self.used > self.budget:
+                _, evicted = self._data.popitem(last=False)
+                self.used -= len(evicted[0])
+
+    def stats(self) -> dict:
+        return {"entries": len(self._data), "bytes": self.used, "budget": self.budget, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,235 @@
+import os, csv, json, time, uuid, itertools, click
+from datetime import datetime
+from flask.cli import AppGroup
+from sqlalchemy import select, insert, delete
+from sqlalchemy.exc import IntegrityError
+from app.extensions import SessionLocal
+from app.models import User, AuthLocal, FriendshipCounter, UserSearchTerm, RefreshToken, TokenRevocation
+
+cli = AppGroup("nexo", help="Comandos de mantenimiento de Nexo.")
+
+
+@cli.command("reindex-search")
+@click.option("--batch-size", default=1000, show_default=True)
+def reindex_search(batch_size):
+    """Reconstruye user_search_terms para todos los usuarios."""
+    from app.search import index_user
+
+    last_id, total = 0, 0
+    with SessionLocal() as db:
+        while True:
+            rows = db.execute(
+                select(User.id, User.nombre, User.apellido, User.username, AuthLocal.email)
+                .outerjoin(AuthLocal, AuthLocal.user_id == User.id)
+                .where(User.id > last_id)
+                .order_by(User.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            for r in rows:
+                index_user(db, r.id, r.nombre, r.apellido, r.username, r.email)
+            db.commit()
+            last_id = rows[-1].id
+            total += len(rows)
+            click.echo(f"{total} usuarios indexados")
+
+
+@cli.command("reconcile-friend-counts")
+@click.option("--batch-size", default=1000, show_default=True)
+def reconcile_friend_counts(batch_size):
+    """Recalcula friendship_counters a partir de friendships."""
+    from app.counters import recompute
+
+    last_id, total = 0, 0
+    with SessionLocal() as db:
+        while True:
+            ids = db.execute(
+                select(User.id).where(User.id > last_id).order_by(User.id).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            recompute(db, ids)
+            db.commit()
+            last_id = ids[-1]
+            total += len(ids)
+            click.echo(f"{total} usuarios reconciliados")
+
+
+@cli.command("prune-refresh-tokens")
+def prune_refresh_tokens():
+    """Borra refresh tokens vencidos (los revocados se conservan hasta vencer para detectar reuso)."""
+    with SessionLocal() as db:
+        deleted = db.execute(delete(RefreshToken).where(RefreshToken.expires_at < datetime.utcnow())).rowcount
+        db.commit()
+    click.echo(f"{deleted} refresh tokens eliminados")
+
+
+@cli.command("prune-revocations")
+def prune_revocations():
+    """Borra revocaciones de access tokens que ya vencieron."""
+    with SessionLocal() as db:
+        deleted = db.execute(delete(TokenRevocation).where(TokenRevocation.expires_at < datetime.utcnow())).rowcount
+        db.commit()
+    click.echo(f"{deleted} revocaciones eliminadas")
+
+
+IMPORT_FIELDS = ["nombre", "apellido", "email", "fecha_nacimiento", "username", "password"]
+
+
+def _read_records(fh, fmt: str):
+    """Genera ``(línea, registro)``; las líneas JSON mal formadas salen como registro None."""
+    if fmt == "csv":
+        reader = csv.DictReader(fh)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_no, line in enumerate(fh, 1):
+        if line.strip():
+            try:
+                yield line_no, json.loads(line)
+            except ValueError:
+                yield line_no, None
+
+
+def _validate(record) -> tuple[dict | None, str | None]:
+    # Mismas reglas que POST /auth/register.
+    from app.security import is_valid_password, is_adult
+
+    if not isinstance(record, dict):
+        return None, "Registro inválido"
+    if not all(record.get(k) for k in IMPORT_FIELDS):
+        return None, "Faltan campos"
+    try:
+        fecha = datetime.strptime(str(record["fecha_nacimiento"]), "%Y-%m-%d").date()
+    except ValueError:
+        return None, "fecha_nacimiento inválida"
+    if not is_adult(fecha):
+        return None, "Debe ser mayor de 18"
+    if not is_valid_password(str(record["password"])):
+        return None, "Password no cumple política"
+    row = {
+        "nombre": str(record["nombre"]).strip(),
+        "apellido": str(record["apellido"]).strip(),
+        "email": str(record["email"]).strip().lower(),
+        "username": str(record["username"]).strip().lower(),
+        "fecha_nacimiento": fecha,
+        "password": str(record["password"]),
+    }
+    for field, column in (("nombre", User.nombre), ("apellido", User.apellido),
+                          ("username", User.username), ("email", AuthLocal.email)):
+        if len(row[field]) > column.type.length:
+            return None, f"{field} demasiado largo"
+    return row, None
+
+
+def _taken(db, rows: list[dict]) -> tuple[set, set]:
+    emails = set(db.execute(select(AuthLocal.email).where(AuthLocal.email.in_([r["email"] for r in rows]))).scalars())
+    usernames = set(db.execute(select(User.username).where(User.username.in_([r["username"] for r in rows]))).scalars())
+    return emails, usernames
+
+
+def _insert_batch(db, rows: list[dict]) -> None:
+    from app.search import build_terms
+
+    for r in rows:
+        r["user_uuid"] = str(uuid.uuid4())
+    db.execute(insert(User.__table__), [
+        {k: r[k] for k in ("user_uuid", "nombre", "apellido", "username", "fecha_nacimiento")} for r in rows
+    ])
+    ids = dict(db.execute(select(User.user_uuid, User.id).where(User.user_uuid.in_([r["user_uuid"] for r in rows]))).all())
+    db.execute(insert(AuthLocal.__table__), [
+        {"user_id": ids[r["user_uuid"]], "email": r["email"], "password_hash": r["password_hash"]} for r in rows
+    ])
+    db.execute(insert(FriendshipCounter.__table__), [{"user_id": ids[r["user_uuid"]]} for r in rows])
+    terms = [t for r in rows for t in build_terms(ids[r["user_uuid"]], r["nombre"], r["apellido"], r["username"], r["email"])]
+    if terms:
+        db.execute(insert(UserSearchTerm.__table__), terms)
+
+
+@cli.command("import-users")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), help="Por defecto según la extensión.")
+@click.option("--batch-size", default=1000, show_default=True)
+@click.option("--workers", default=os.cpu_count() or 1, show_default=True, help="Procesos para Argon2.")
+@click.option("--rejects", type=click.Path(dir_okay=False), help="Por defecto <path>.rejects.jsonl")
+def import_users(path, fmt, batch_size, workers, rejects):
+    """Importa usuarios desde CSV/JSONL con inserts multi-fila por lote.
+
+    Columnas: nombre, apellido, email, fecha_nacimiento (YYYY-MM-DD), username, password.
+    Los registros inválidos o duplicados se escriben en el archivo de rechazos con su motivo.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from app.security import hash_passwords
+
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    rejects = rejects or f"{path}.rejects.jsonl"
+    seen_emails, seen_usernames = set(), set()
+    imported = rejected = processed = 0
+    started = time.perf_counter()
+
+    with open(path, encoding="utf-8", newline="") as src, open(rejects, "w", encoding="utf-8") as rej, \
+            ProcessPoolExecutor(max_workers=workers) as pool, SessionLocal() as db:
+
+        def reject(line, record, error):
+            nonlocal rejected
+            rejected += 1
+            if isinstance(record, dict):
+                record = {k: v for k, v in record.items() if k != "password"}
+            rej.write(json.dumps({"line": line, "error": error, "record": record}, ensure_ascii=False, default=str) + "\n")
+
+        records = _read_records(src, fmt)
+        while batch := list(itertools.islice(records, batch_size)):
+            processed += len(batch)
+            candidates = []
+            for line, record in batch:
+                row, error = _validate(record)
+                if error:
+                    reject(line, record, error)
+                elif row["email"] in seen_emails:
+                    reject(line, record, "Email duplicado en el archivo")
+                elif row["username"] in seen_usernames:
+                    reject(line, record, "Username duplicado en el archivo")
+                else:
+                    seen_emails.add(row["email"])
+                    seen_usernames.add(row["username"])
+                    candidates.append((line, record, row))
+
+            # Se deduplica contra la BD antes de hashear para no gastar Argon2 en filas descartadas.
+            for attempt in range(2):
+                if not candidates:
+                    break
+                emails, usernames = _taken(db, [row for _, _, row in candidates])
+                fresh = []
+                for line, record, row in candidates:
+                    if row["email"] in emails:
+                        reject(line, record, "Email ya registrado")
+                    elif row["username"] in usernames:
+                        reject(line, record, "Username ya registrado")
+                    else:
+                        fresh.append((line, record, row))
+                candidates = fresh
+                if not candidates:
+                    break
+                rows = [row for _, _, row in candidates]
+                if "password_hash" not in rows[0]:
+                    hashes = hash_passwords([r["password"] for r in rows], pool,
+                                            chunksize=max(len(rows) // (4 * workers), 1))
+                    for r, h in zip(rows, hashes):
+                        r["password_hash"] = h
+                try:
+                    _insert_batch(db, rows)
+                    db.commit()
+                    imported += len(rows)
+                    break
+                except IntegrityError:
+                    # Un registro concurrente por la API ganó la carrera; se vuelve a deduplicar una vez.
+                    db.rollback()
+                    if attempt:
+                        for line, record, _ in candidates:
+                            reject(line, record, "Conflicto de unicidad")
+
+            rate = processed / (time.perf_counter() - started)
+            click.echo(f"{processed} procesados, {imported} importados, {rejected} rechazados ({rate:.0f}/s)")
+
+    click.echo(f"Rechazos en {rejects}" if rejected else "Sin rechazos")
@@ -0,0 +1,61 @@
+from collections import defaultdict
+from sqlalchemy import select, update, delete, insert, func, bindparam, case
+from app.models import Friendship, FriendshipCounter
+
+FIELDS = ("accepted", "incoming_pending", "outgoing_pending")
+
+# Efecto de cada evento (actor, otro) sobre los contadores de ambos usuarios.
+_DELTAS = {
+    "request":  ({"outgoing_pending": 1}, {"incoming_pending": 1}),
+    "accept":   ({"incoming_pending": -1, "accepted": 1}, {"outgoing_pending": -1, "accepted": 1}),
+    "reject":   ({"incoming_pending": -1}, {"outgoing_pending": -1}),
+    "unfriend": ({"accepted": -1}, {"accepted": -1}),
+}
+
+_table = FriendshipCounter.__table__
+_bump = (
+    update(_table)
+    .where(_table.c.user_id == bindparam("b_user_id"))
+    .values({f: _table.c[f] + bindparam(f"b_{f}") for f in FIELDS})
+)
+
+
+def apply_events(db, events: list) -> None:
+    """Suma los deltas de ``events`` en la transacción actual, un UPDATE relativo por usuario."""
+    deltas = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+    for kind, actor, other in events:
+        mine, theirs = _DELTAS[kind]
+        for uid, d in ((actor, mine), (other, theirs)):
+            for f, v in d.items():
+                deltas[uid][f] += v
+    if deltas:
+        db.execute(_bump, [{"b_user_id": uid, **{f"b_{f}": v for f, v in d.items()}} for uid, d in deltas.items()])
+
+
+def recompute(db, user_ids: list[int]) -> None:
+    """Recalcula desde ``friendships`` los contadores de ``user_ids`` (borra e inserta).
+
+    Lee las amistades con lectura bloqueante (FOR SHARE), en el mismo orden que las transiciones
+    (primero friendships, después contadores): lo confirmado antes entra en el conteo y lo que llega
+    después espera al commit y suma su delta encima, así que puede correr con tráfico en vivo.
+    """
+    counts = {uid: dict.fromkeys(FIELDS, 0) for uid in user_ids}
+    for me_col in (Friendship.user_low_id, Friendship.user_high_id):
+        rows = db.execute(
+            select(
+                me_col,
+                Friendship.status,
+                case((Friendship.requested_by_id == me_col, 1), else_=0).label("mine"),
+                func.count(),
+            )
+            .where(me_col.in_(user_ids), Friendship.status.in_(("accepted", "pending")))
+            .group_by(me_col, Friendship.status, "mine")
+            .with_for_update(read=True)
+        )
+        for uid, status, mine, n in rows:
+            if status == "accepted":
+                counts[uid]["accepted"] += n
+            else:
+                counts[uid]["outgoing_pending" if mine else "incoming_pending"] += n
+    db.execute(delete(FriendshipCounter).where(FriendshipCounter.user_id.in_(user_ids)))
+    db.execute(insert(FriendshipCounter), [{"user_id": uid, **c} for uid, c in counts.items()])
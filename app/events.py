@@ -0,0 +1,285 @@
+"""Eventos de amistad en tiempo real (SSE) para ``GET /friends/events``.
+
+Las transiciones confirmadas se agregan a un log local (``FRIEND_EVENTS_FILE``, por defecto en
+/dev/shm) compartido por todos los workers del host. Cada proceso tiene un único hilo que sigue
+el log y reparte los eventos a las suscripciones de sus conexiones, cada una con una cola
+acotada; si un cliente no da abasto se le envía ``reset`` y se cierra para que resincronice
+con ``GET /friends``.
+
+El id de cada evento es ``<inodo>-<offset>``: el offset donde termina la línea en el log. Con
+``Last-Event-ID`` se relee el log desde ahí (incluido el archivo rotado ``.1``).
+"""
+import os, json, time, fcntl, asyncio, logging, threading
+from collections import deque
+from config import Settings
+
+log = logging.getLogger(__name__)
+
+
+def _event_id(ino: int, offset: int) -> str:
+    return f"{ino}-{offset}"
+
+
+def parse_event_id(value: str | None) -> tuple[int, int] | None:
+    try:
+        ino, offset = value.split("-")
+        return int(ino), int(offset)
+    except (AttributeError, ValueError):
+        return None
+
+
+class _Writer:
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._fd = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def append(self, lines: list[bytes]) -> None:
+        with self._lock, open(self.path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                st = os.stat(self.path) if os.path.exists(self.path) else None
+                if st and st.st_size >= self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+                    st = None
+                # Otro worker pudo haber rotado el archivo: se reabre si el inodo cambió.
+                if self._pid != os.getpid() or st is None or os.fstat(self._fd).st_ino != st.st_ino:
+                    if self._fd is not None and self._pid == os.getpid():
+                        os.close(self._fd)
+                    self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+                    self._pid = os.getpid()
+                os.write(self._fd, b"".join(lines))
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class Subscription:
+    """Cola acotada de una conexión. La llena el hilo lector; la consume la respuesta SSE."""
+
+    def __init__(self, hub, user_id: int, maxsize: int, loop: asyncio.AbstractEventLoop | None = None):
+        self.hub = hub
+        self.user_id = user_id
+        self.maxsize = maxsize
+        self.overflowed = False
+        self._items: deque = deque()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._loop = loop
+        self._aready = asyncio.Event() if loop else None
+
+    def push(self, item) -> None:
+        with self._lock:
+            if len(self._items) >= self.maxsize:
+                self.overflowed = True
+            else:
+                self._items.append(item)
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._aready.set)
+        else:
+            self._ready.set()
+
+    def drain(self) -> list:
+        with self._lock:
+            items = list(self._items)
+            self._items.clear()
+            self._ready.clear()
+            if self._aready:
+                self._aready.clear()
+        return items
+
+    def wait(self, timeout: float) -> None:
+        self._ready.wait(timeout)
+
+    async def await_items(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._aready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def close(self) -> None:
+        self.hub.unsubscribe(self)
+
+
+class EventHub:
+    def __init__(self, path: str, max_bytes: int, poll_interval: float):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.writer = _Writer(path, max_bytes)
+        self._subs: dict[int, set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fh = None
+        self._ino = 0
+        self._pos = 0
+
+    # --- publicación ---
+
+    def publish(self, events: list, uuids: dict[int, str]) -> None:
+        """``events`` son los ``(kind, actor_id, other_id)`` de las transiciones ya confirmadas."""
+        now = time.time()
+        self.writer.append([
+            json.dumps({"k": kind, "a": a, "b": b, "au": uuids[a], "bu": uuids[b], "t": now},
+                       separators=(",", ":")).encode() + b"\n"
+            for kind, a, b in events
+        ])
+
+    # --- suscripción ---
+
+    def subscribe(self, user_id: int, maxsize: int, loop=None) -> tuple[Subscription, tuple[int, int]]:
+        """Registra la conexión y devuelve la posición del lector: lo anterior sale del log."""
+        self._ensure_reader()
+        sub = Subscription(self, user_id, maxsize, loop)
+        with self._lock:
+            self._subs.setdefault(user_id, set()).add(sub)
+            return sub, (self._ino, self._pos)
+
+    def tail(self) -> tuple[int, int]:
+        """Fin del log ahora, sin hilo lector: bajo el lock de escritura no hay líneas a medias."""
+        with open(self.path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH)
+            fd = os.open(self.path, os.O_RDONLY | os.O_CREAT, 0o600)
+            try:
+                st = os.fstat(fd)
+                return st.st_ino, st.st_size
+            finally:
+                os.close(fd)
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subs.get(sub.user_id)
+            if subs:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[sub.user_id]
+
+    def backlog(self, user_id: int, since: tuple[int, int], until: tuple[int, int]) -> list | None:
+        """Eventos del usuario entre dos ids; None si ``since`` ya no está en el log."""
+        since_ino, since_pos = since
+        until_ino, until_pos = until
+        files = []
+        for path in (self.path + ".1", self.path):
+            try:
+                files.append((os.stat(path).st_ino, path))
+            except FileNotFoundError:
+                pass
+        out, started = [], False
+        for ino, path in files:
+            if ino == since_ino:
+                started, start = True, since_pos
+            elif started:
+                start = 0
+            else:
+                continue
+            with open(path, "rb") as fh:
+                fh.seek(start)
+                for ino_, end, ev in self._read_lines(fh, ino, until_pos if ino == until_ino else None):
+                    if user_id in (ev["a"], ev["b"]):
+                        out.append((_event_id(ino_, end), ev))
+            if ino == until_ino:
+                break
+        return out if started else None
+
+    # --- hilo lector, uno por proceso ---
+
+    def _ensure_reader(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # En un worker forkeado no existe el hilo del padre ni sus conexiones.
+            self._subs = {}
+            self._pid = os.getpid()
+            self._open_current(at_end=True)
+            threading.Thread(target=self._run, name="friend-events", daemon=True).start()
+
+    def _open_current(self, at_end: bool) -> None:
+        fd = os.open(self.path, os.O_RDONLY | os.O_CREAT, 0o600)
+        self._fh = os.fdopen(fd, "rb")
+        self._ino = os.fstat(fd).st_ino
+        self._pos = self._fh.seek(0, os.SEEK_END) if at_end else 0
+
+    @staticmethod
+    def _read_lines(fh, ino: int, until: int | None = None):
+        pos = fh.tell()
+        while until is None or pos < until:
+            line = fh.readline()
+            if not line.endswith(b"\n"):
+                # Línea a medio escribir: se relee completa en la próxima vuelta.
+                fh.seek(pos)
+                return
+            pos += len(line)
+            try:
+                ev = json.loads(line)
+            except ValueError:
+                log.error("Línea inválida en el log de eventos (inodo %d, offset %d), se omite", ino, pos - len(line))
+                continue
+            yield ino, pos, ev
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self._poll()
+            except Exception:
+                log.exception("Error leyendo el log de eventos de amistad")
+            time.sleep(self.poll_interval)
+
+    def _poll(self) -> None:
+        rotated = False
+        try:
+            rotated = os.stat(self.path).st_ino != self._ino
+        except FileNotFoundError:
+            pass
+        batch = list(self._read_lines(self._fh, self._ino))
+        if rotated:
+            # Se termina el archivo viejo (sigue abierto) antes de pasar al nuevo.
+            self._fh.close()
+            self._open_current(at_end=False)
+            batch += list(self._read_lines(self._fh, self._ino))
+        if not batch:
+            return
+        dead = []
+        with self._lock:
+            for ino, end, ev in batch:
+                for uid in {ev["a"], ev["b"]}:
+                    for sub in self._subs.get(uid, ()):
+                        try:
+                            sub.push((_event_id(ino, end), ev))
+                        except Exception:
+                            # P. ej. el loop de la conexión ya cerró: no debe cortar el reparto a los demás.
+                            log.exception("Suscripción de eventos inválida, se descarta")
+                            dead.append(sub)
+            self._pos = self._fh.tell()
+        for sub in dead:
+            self.unsubscribe(sub)
+
+
+def render(user_id: int, event_id: str, ev: dict) -> bytes:
+    """Evento SSE desde el punto de vista de ``user_id``."""
+    mine = ev["a"] == user_id
+    data = {"user_uuid": ev["bu"] if mine else ev["au"], "by_me": mine, "at": ev["t"]}
+    return f"id: {event_id}\nevent: {ev['k']}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+RESET = b"event: reset\ndata: {}\n\n"
+HEARTBEAT = b": ping\n\n"
+
+
+def opening(user_id: int, last_event_id: str | None, position: tuple[int, int], retry_ms: int = 2000) -> bytes:
+    """Primer bloque del stream: reintento sugerido, lo perdido desde ``Last-Event-ID`` y la
+    posición actual. Un ``id:`` sin ``data:`` no dispara evento pero actualiza el Last-Event-ID
+    del navegador, así una reconexión sin eventos intermedios tampoco pierde nada."""
+    head = f"retry: {retry_ms}\n\n".encode()
+    here = f"id: {_event_id(*position)}\n\n".encode()
+    since = parse_event_id(last_event_id)
+    if last_event_id is None:
+        return head + here
+    missed = hub.backlog(user_id, since, position) if since else None
+    if missed is None:
+        # El id ya no está en el log (rotado o inválido): el cliente debe releer GET /friends.
+        return head + RESET + here
+    return head + b"".join(render(user_id, eid, ev) for eid, ev in missed) + here
+
+
+hub = EventHub(Settings.FRIEND_EVENTS_FILE, Settings.FRIEND_EVENTS_MAX_MB * 1024 * 1024, Settings.FRIEND_EVENTS_POLL_S)
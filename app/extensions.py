@@ -1,12 +1,138 @@
+import time, threading, itertools
 from flask_cors import CORS
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker, declarative_base
+from sqlalchemy import create_engine, event, DateTime
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.orm import Session, scoped_session, sessionmaker, declarative_base
 from config import Settings
 
 
-engine = create_engine(Settings.SQLALCHEMY_DATABASE_URI, pool_pre_ping=True, future=True)
+class TimedQueuePool(QueuePool):
+    """QueuePool que mide cuánto espera cada checkout por una conexión libre."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_total_s += waited
+            self.wait_max_s = max(self.wait_max_s, waited)
+
+
+def _make_engine(url: str):
+    return create_engine(
+        url,
+        poolclass=TimedQueuePool,
+        pool_pre_ping=True,
+        pool_size=Settings.DB_POOL_SIZE,
+        max_overflow=Settings.DB_MAX_OVERFLOW,
+        pool_recycle=Settings.DB_POOL_RECYCLE_S,
+        pool_timeout=Settings.DB_POOL_TIMEOUT_S,
+        future=True,
+    )
+
+
+engine = _make_engine(Settings.SQLALCHEMY_DATABASE_URI)
+replica_engines = [_make_engine(url) for url in Settings.DB_REPLICA_URIS]
+
+_replica_cycle = itertools.cycle(replica_engines)
+_replica_lock = threading.Lock()
+_replica_down_until: dict = {}
+
+
+def _mark_replica_down(ctx):
+    if ctx.is_disconnect or ctx.connection is None:
+        _replica_down_until[ctx.engine] = time.monotonic() + Settings.DB_REPLICA_RETRY_S
+
+
+for _e in replica_engines:
+    event.listen(_e, "handle_error", _mark_replica_down)
+
+
+def _pick_replica():
+    now = time.monotonic()
+    with _replica_lock:
+        for _ in range(len(replica_engines)):
+            candidate = next(_replica_cycle)
+            if _replica_down_until.get(candidate, 0) <= now:
+                return candidate
+    return None
+
+
+class ReplicaSession(Session):
+    """Sesión de sólo lectura: consulta una réplica sana y cae al primario si no hay ninguna.
+
+    Si no se puede conectar a la réplica elegida, se marca caída y el mismo request sigue en el
+    primario; los errores después de conectar no se reintentan.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or not replica_engines:
+            return engine
+        if "replica" not in self.info:
+            self.info["replica"] = _pick_replica() or engine
+        return self.info["replica"]
+
+    def _connection_for_bind(self, bind, execution_options=None, **kw):
+        try:
+            return super()._connection_for_bind(bind, execution_options, **kw)
+        except OperationalError:
+            if bind is engine or bind is not self.info.get("replica"):
+                raise
+            _replica_down_until[bind] = time.monotonic() + Settings.DB_REPLICA_RETRY_S
+            self.info["replica"] = engine
+            return super()._connection_for_bind(engine, execution_options, **kw)
+
+    def close(self):
+        self.info.pop("replica", None)
+        super().close()
+
+
 SessionLocal = scoped_session(sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True))
+ReadSessionLocal = scoped_session(sessionmaker(class_=ReplicaSession, autoflush=False, autocommit=False, future=True))
 Base = declarative_base()
 
+# SQLite guarda CURRENT_TIMESTAMP sin microsegundos; los valores enlazados usan el mismo
+# formato para que las comparaciones de cursores se comporten como DATETIME de MySQL.
+Timestamp = DateTime().with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite",
+)
+
+
+def pool_stats() -> dict:
+    def one(e):
+        p = e.pool
+        return {
+            "size": p.size(),
+            "checked_out": p.checkedout(),
+            "overflow": p.overflow(),
+            "checkouts": p.checkouts,
+            "wait_ms_total": round(p.wait_total_s * 1000, 3),
+            "wait_ms_max": round(p.wait_max_s * 1000, 3),
+        }
+    return {
+        "primary": one(engine),
+        "replicas": [dict(one(e), down=_replica_down_until.get(e, 0) > time.monotonic()) for e in replica_engines],
+    }
+
+def reset_after_fork() -> None:
+    """Descarta sin cerrarlas las conexiones heredadas del master; el worker abre las suyas."""
+    for e in (engine, *replica_engines):
+        e.dispose(close=False)
+    _replica_down_until.clear()
+    SessionLocal.remove()
+    ReadSessionLocal.remove()
+
+
 def init_cors(app):
     CORS(app, resources={r"/*": {"origins": Settings.CORS_ORIGINS}})
@@ -0,0 +1,121 @@
+import heapq, threading, time, datetime as dt
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from sqlalchemy import select, func
+from app.extensions import SessionLocal, ReadSessionLocal
+from app.models import Friendship
+from config import Settings
+
+_EMPTY = array("i")
+
+
+class FriendGraph:
+    """Amistades aceptadas en memoria: user_id -> array('i') ordenado de ids de amigos.
+
+    Los arrays publicados no se mutan (copy-on-write), así que se leen sin lock. Los cambios
+    locales se aplican al confirmar; los de otros workers llegan con la sincronización
+    incremental por ``friendships.updated_at``, que lee del primario: con una réplica atrasada
+    más que FRIENDS_SYNC_SKEW_S se perderían cambios. La carga inicial sí va a la réplica; su
+    marca es el updated_at más reciente que ésta ya aplicó.
+    """
+
+    def __init__(self, sync_interval: float):
+        self._adj: dict[int, array] = {}
+        self._lock = threading.Lock()
+        self._sync_interval = sync_interval
+        self._loaded = False
+        self._watermark = None
+        self._next_sync = 0.0
+
+    def _ensure_fresh(self) -> None:
+        now = time.monotonic()
+        if now < self._next_sync:
+            return
+        with self._lock:
+            if now < self._next_sync:
+                return
+            # Sesión propia (no la del scoped_session) para no cerrar la del request en curso.
+            if not self._loaded:
+                with ReadSessionLocal.session_factory() as db:
+                    self._load(db)
+            else:
+                with SessionLocal.session_factory() as db:
+                    self._sync(db)
+            self._next_sync = now + self._sync_interval
+
+    def _load(self, db) -> None:
+        # La marca se toma antes de leer: lo que cambie durante la carga entra en el próximo sync.
+        watermark = db.scalar(select(func.max(Friendship.updated_at)))
+        adj = defaultdict(list)
+        rows = db.execute(
+            select(Friendship.user_low_id, Friendship.user_high_id)
+            .where(Friendship.status == "accepted")
+            .execution_options(yield_per=10000)
+        )
+        for low, high in rows:
+            adj[low].append(high)
+            adj[high].append(low)
+        self._adj = {uid: array("i", sorted(ids)) for uid, ids in adj.items()}
+        self._watermark = watermark
+        self._loaded = True
+
+    def _sync(self, db) -> None:
+        q = select(Friendship.user_low_id, Friendship.user_high_id, Friendship.status, Friendship.updated_at)
+        if self._watermark is not None:
+            # Se relee una ventana de FRIENDS_SYNC_SKEW_S: un accept/unfriend con updated_at anterior
+            # puede confirmarse después de esta pasada. Cada fila trae el estado actual del par, así
+            # que aplicarla de nuevo es idempotente.
+            q = q.where(Friendship.updated_at >= self._watermark - dt.timedelta(seconds=Settings.FRIENDS_SYNC_SKEW_S))
+        for low, high, status, updated_at in db.execute(q):
+            (self._link if status == "accepted" else self._unlink)(low, high)
+            if self._watermark is None or updated_at > self._watermark:
+                self._watermark = updated_at
+
+    def _link(self, a: int, b: int) -> None:
+        for x, y in ((a, b), (b, a)):
+            arr = self._adj.get(x, _EMPTY)
+            i = bisect_left(arr, y)
+            if i < len(arr) and arr[i] == y:
+                continue
+            new = array("i", arr)
+            new.insert(i, y)
+            self._adj[x] = new
+
+    def _unlink(self, a: int, b: int) -> None:
+        for x, y in ((a, b), (b, a)):
+            arr = self._adj.get(x, _EMPTY)
+            i = bisect_left(arr, y)
+            if i < len(arr) and arr[i] == y:
+                new = array("i", arr)
+                del new[i]
+                self._adj[x] = new
+
+    def add(self, a: int, b: int) -> None:
+        with self._lock:
+            self._link(a, b)
+
+    def remove(self, a: int, b: int) -> None:
+        with self._lock:
+            self._unlink(a, b)
+
+    def friends_of(self, user_id: int) -> array:
+        self._ensure_fresh()
+        return self._adj.get(user_id, _EMPTY)
+
+    def mutual_count(self, a: int, b: int) -> int:
+        small, big = sorted((self.friends_of(a), self.friends_of(b)), key=len)
+        return len(set(small).intersection(big)) if small else 0
+
+    def suggestions(self, user_id: int, limit: int, exclude: set[int] = frozenset()) -> list[tuple[int, int]]:
+        """Top ``limit`` de (user_id, amigos en común) entre los no-amigos a dos saltos."""
+        mine = self.friends_of(user_id)
+        counts = Counter()
+        for f in mine:
+            counts.update(self._adj.get(f, _EMPTY))
+        for x in (user_id, *mine, *exclude):
+            counts.pop(x, None)
+        return heapq.nlargest(limit, counts.items(), key=lambda kv: (kv[1], -kv[0]))
+
+
+friend_graph = FriendGraph(Settings.FRIEND_GRAPH_SYNC_S)
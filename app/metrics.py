@@ -0,0 +1,87 @@
+"""Métricas Prometheus en /metrics.
+
+Con ``PROMETHEUS_MULTIPROC_DIR`` definido (gunicorn con varios workers) cada proceso escribe
+sus valores en archivos mmap de ese directorio y /metrics agrega todos los workers.
+"""
+import os, time, threading
+from flask import request, Response
+from sqlalchemy import event
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, generate_latest, multiprocess, REGISTRY, CONTENT_TYPE_LATEST,
+)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+REQUEST_SECONDS = Histogram(
+    "nexo_http_request_duration_seconds", "Latencia por ruta.",
+    ["blueprint", "endpoint", "method"], buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    "nexo_http_requests_total", "Respuestas por ruta y código.",
+    ["blueprint", "endpoint", "method", "status"],
+)
+SQL_STATEMENTS = Histogram(
+    "nexo_http_request_sql_statements", "Sentencias SQL por request.",
+    ["endpoint"], buckets=(0, 1, 2, 3, 4, 6, 8, 12, 20, 50, 100),
+)
+DB_SECONDS = Histogram(
+    "nexo_http_request_db_seconds", "Tiempo en la BD por request.",
+    ["endpoint"], buckets=LATENCY_BUCKETS,
+)
+ARGON2_SECONDS = Histogram(
+    "nexo_argon2_seconds", "Tiempo de hashing/verificación Argon2, incluida la espera en el pool.",
+    ["op"], buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+RATE_LIMITED = Counter(
+    "nexo_rate_limited_total", "Solicitudes rechazadas por rate limiting.", ["route", "key"],
+)
+
+_local = threading.local()
+
+
+def _before_cursor(conn, cursor, statement, parameters, context, executemany):
+    _local.sql_started = time.perf_counter()
+
+
+def _after_cursor(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_local, "active", False):
+        _local.sql_count += 1
+        _local.sql_seconds += time.perf_counter() - _local.sql_started
+
+
+def _start():
+    _local.active = True
+    _local.started = time.perf_counter()
+    _local.sql_count = 0
+    _local.sql_seconds = 0.0
+
+
+def _finish(response):
+    if not getattr(_local, "active", False):
+        return response
+    _local.active = False
+    endpoint = request.endpoint or "unmatched"
+    blueprint = request.blueprint or ""
+    REQUEST_SECONDS.labels(blueprint, endpoint, request.method).observe(time.perf_counter() - _local.started)
+    REQUESTS.labels(blueprint, endpoint, request.method, str(response.status_code)).inc()
+    SQL_STATEMENTS.labels(endpoint).observe(_local.sql_count)
+    DB_SECONDS.labels(endpoint).observe(_local.sql_seconds)
+    return response
+
+
+def metrics_view():
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app, engines):
+    for e in engines:
+        event.listen(e, "before_cursor_execute", _before_cursor)
+        event.listen(e, "after_cursor_execute", _after_cursor)
+    app.before_request(_start)
+    app.after_request(_finish)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
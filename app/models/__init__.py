@@ -1,3 +1,7 @@
 from app.models.user import User
 from app.models.auth_local import AuthLocal
-from app.models.friendship import Friendship
\ No newline at end of file
+from app.models.friendship import Friendship
+from app.models.user_search_term import UserSearchTerm
+from app.models.friendship_counter import FriendshipCounter
+from app.models.refresh_token import RefreshToken
+from app.models.token_revocation import TokenRevocation
@@ -1,7 +1,7 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, ForeignKey, func
+from sqlalchemy import String, Integer, ForeignKey, Index, func
 from datetime import datetime
-from app.extensions import Base
+from app.extensions import Base, Timestamp
 
 
 class AuthLocal(Base):
@@ -10,6 +10,8 @@ class AuthLocal(Base):
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), unique=True, index=True)
     email: Mapped[str] = mapped_column(String(191), unique=True, index=True, nullable=False)
     password_hash: Mapped[str] = mapped_column(String(255), nullable=False)
-    created_at: Mapped[datetime] = mapped_column(server_default=func.now())
-    updated_at: Mapped[datetime] = mapped_column(server_default=func.now(), onupdate=func.now())
+    created_at: Mapped[datetime] = mapped_column(Timestamp, server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(Timestamp, server_default=func.now(), onupdate=func.now())
     user: Mapped["User"] = relationship(back_populates="auth")
+
+    __table_args__ = (Index("ix_auth_local_updated_at", "updated_at"),)
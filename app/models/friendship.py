@@ -1,7 +1,7 @@
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import Integer, String, UniqueConstraint, func
+from sqlalchemy import Integer, String, UniqueConstraint, Index, func
 from datetime import datetime
-from app.extensions import Base
+from app.extensions import Base, Timestamp
 
 
 class Friendship(Base):
@@ -14,7 +14,12 @@ class Friendship(Base):
     status: Mapped[str] = mapped_column(String(16), nullable=False) 
     requested_by_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
-    created_at: Mapped[datetime] = mapped_column(server_default=func.now())
-    updated_at: Mapped[datetime] = mapped_column(server_default=func.now(), onupdate=func.now())
+    created_at: Mapped[datetime] = mapped_column(Timestamp, server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(Timestamp, server_default=func.now(), onupdate=func.now())
 
-    __table_args__ = (UniqueConstraint("user_low_id", "user_high_id", name="uq_friend_pair"),)
+    __table_args__ = (
+        UniqueConstraint("user_low_id", "user_high_id", name="uq_friend_pair"),
+        Index("ix_friendships_low_updated", "user_low_id", "updated_at", "id"),
+        Index("ix_friendships_high_updated", "user_high_id", "updated_at", "id"),
+        Index("ix_friendships_updated_at", "updated_at"),
+    )
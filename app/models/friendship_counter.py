@@ -0,0 +1,11 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, ForeignKey, text
+from app.extensions import Base
+
+
+class FriendshipCounter(Base):
+    __tablename__ = "friendship_counters"
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    accepted: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default=text("0"))
+    incoming_pending: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default=text("0"))
+    outgoing_pending: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default=text("0"))
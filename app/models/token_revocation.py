@@ -0,0 +1,13 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, Integer, func
+from datetime import datetime
+from app.extensions import Base, Timestamp
+
+
+class TokenRevocation(Base):
+    __tablename__ = "token_revocations"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    jti: Mapped[str] = mapped_column(String(36), unique=True, nullable=False)
+    # Exp del access token revocado: pasado ese instante la fila ya no aporta y se puede borrar.
+    expires_at: Mapped[datetime] = mapped_column(Timestamp, index=True, nullable=False)
+    revoked_at: Mapped[datetime] = mapped_column(Timestamp, index=True, server_default=func.now())
@@ -1,9 +1,9 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Date, Integer, func
+from sqlalchemy import String, Date, Integer, Index, func
 from datetime import date, datetime
 import uuid
 from typing import Optional
-from app.extensions import Base
+from app.extensions import Base, Timestamp
 
 
 class User(Base):    
@@ -15,6 +15,11 @@ class User(Base):
     username: Mapped[str] = mapped_column(String(50), unique=True, index=True, nullable=False)
     fecha_nacimiento: Mapped[date] = mapped_column(Date, nullable=False)
     avatar_path: Mapped[Optional[str]] = mapped_column(String(255))
-    created_at: Mapped[datetime] = mapped_column(server_default=func.now())
-    updated_at: Mapped[datetime] = mapped_column(server_default=func.now(), onupdate=func.now())
+    created_at: Mapped[datetime] = mapped_column(Timestamp, server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(Timestamp, server_default=func.now(), onupdate=func.now())
     auth: Mapped["AuthLocal"] = relationship(back_populates="user", uselist=False, cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_users_created_id", "created_at", "id"),
+        Index("ix_users_updated_at", "updated_at"),
+    )
@@ -0,0 +1,15 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, SmallInteger, ForeignKey
+from sqlalchemy.dialects import mysql
+from app.extensions import Base
+
+# Comparación binaria: la collation por defecto de MySQL iguala términos que el tokenizador
+# distingue (p. ej. hiragana/katakana) y chocarían en la PK.
+Term = String(8).with_variant(mysql.VARCHAR(8, collation="utf8mb4_bin"), "mysql")
+
+
+class UserSearchTerm(Base):
+    __tablename__ = "user_search_terms"
+    term: Mapped[str] = mapped_column(Term, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, index=True)
+    weight: Mapped[int] = mapped_column(SmallInteger, nullable=False)
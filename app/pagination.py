@@ -0,0 +1,26 @@
+from datetime import datetime
+from flask import request
+from itsdangerous import URLSafeSerializer, BadSignature
+from config import Settings
+
+
+_signer = URLSafeSerializer(Settings.SECRET_KEY, salt="nexo-cursor")
+
+
+def encode_cursor(scope: str, ts: datetime, row_id: int, *extra) -> str:
+    return _signer.dumps([scope, ts.isoformat(), row_id, *extra])
+
+
+def decode_cursor(scope: str, token: str) -> tuple | None:
+    """Devuelve ``(ts, row_id, *extra)`` o None si el cursor es inválido o de otro scope."""
+    try:
+        s, ts, row_id, *extra = _signer.loads(token)
+        if s != scope:
+            return None
+        return (datetime.fromisoformat(ts), int(row_id), *extra)
+    except (BadSignature, ValueError, TypeError):
+        return None
+
+
+def parse_limit(default: int, maximum: int) -> int:
+    return max(min(int(request.args.get("limit", default)), maximum), 1)
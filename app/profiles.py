@@ -0,0 +1,16 @@
+import hashlib
+from app.cache import TTLCache
+from config import Settings
+
+# uuid -> (etag, perfil, user_id). Local a cada worker: los demás lo ven actualizado al vencer el TTL.
+profile_cache = TTLCache(Settings.PROFILE_CACHE_SIZE, ttl=Settings.PROFILE_CACHE_TTL_S)
+
+
+def profile_etag(u) -> str:
+    # updated_at tiene resolución de segundos; los campos públicos cubren dos cambios en el mismo segundo.
+    raw = "\x1f".join([u.user_uuid, u.updated_at.isoformat(), u.nombre, u.apellido, u.username, u.avatar_path or ""])
+    return hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+
+
+def invalidate_profile(user_uuid: str) -> None:
+    profile_cache.pop(user_uuid)
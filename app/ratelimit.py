@@ -0,0 +1,130 @@
+"""Token buckets compartidos entre workers sin servicio externo.
+
+Los buckets viven en un archivo mapeado en memoria (``RATE_LIMIT_FILE``, por defecto en
+/dev/shm) dividido en grupos de ``_WAYS`` slots. Cada clave cae en un grupo por hash y el
+grupo se bloquea con ``lockf`` sobre su rango de bytes, así que procesos distintos sólo
+compiten cuando tocan el mismo grupo. Si el grupo está lleno se reemplaza el slot menos
+usado recientemente: un bucket inactivo ya estaría lleno, por lo que perderlo no cambia nada.
+"""
+import os, mmap, time, fcntl, struct, hashlib, threading
+from functools import wraps
+from flask import request, jsonify
+from config import Settings
+from app.metrics import RATE_LIMITED
+
+_SLOT = struct.Struct("<Qdd")  # hash de la clave, tokens, último update (epoch)
+_WAYS = 8
+_GROUP = _SLOT.size * _WAYS
+
+
+class _SharedBuckets:
+    def __init__(self, path: str, slots: int):
+        self.path = path
+        self.groups = max(slots // _WAYS, 1)
+        self._map = None
+        self._fd = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _attach(self):
+        # Tras un fork se reabre el archivo para no compartir el descriptor con el padre.
+        if self._pid != os.getpid():
+            size = self.groups * _GROUP
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._fd, self._map, self._pid = fd, mmap.mmap(fd, size), os.getpid()
+        return self._map
+
+    def _locate(self, key: str) -> tuple[int, int]:
+        h = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+        return h, (h % self.groups) * _GROUP
+
+    def take(self, key: str, capacity: float, period: float) -> float:
+        """Consume un token; devuelve 0 si se permitió o los segundos hasta el próximo token."""
+        h, base = self._locate(key)
+        rate = capacity / period
+        with self._lock:
+            buf = self._attach()
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, _GROUP, base)
+            try:
+                now = time.time()
+                victim, victim_ts = base, float("inf")
+                for off in range(base, base + _GROUP, _SLOT.size):
+                    slot_hash, tokens, updated = _SLOT.unpack_from(buf, off)
+                    if slot_hash == h:
+                        tokens = min(capacity, tokens + (now - updated) * rate)
+                        break
+                    if updated < victim_ts:
+                        victim, victim_ts = off, updated
+                else:
+                    off, tokens = victim, capacity
+                if tokens < 1:
+                    _SLOT.pack_into(buf, off, h, tokens, now)
+                    return (1 - tokens) / rate
+                _SLOT.pack_into(buf, off, h, tokens - 1, now)
+                return 0.0
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, _GROUP, base)
+
+    def refund(self, key: str, capacity: float) -> None:
+        """Devuelve un token consumido por ``take``; si el slot ya se reemplazó, el bucket estaba lleno."""
+        h, base = self._locate(key)
+        with self._lock:
+            buf = self._attach()
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, _GROUP, base)
+            try:
+                for off in range(base, base + _GROUP, _SLOT.size):
+                    slot_hash, tokens, updated = _SLOT.unpack_from(buf, off)
+                    if slot_hash == h:
+                        _SLOT.pack_into(buf, off, h, min(capacity, tokens + 1), updated)
+                        return
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, _GROUP, base)
+
+
+buckets = _SharedBuckets(Settings.RATE_LIMIT_FILE, Settings.RATE_LIMIT_SLOTS)
+
+
+def _client_ip() -> str:
+    return request.remote_addr or "-"
+
+
+def _body_email() -> str | None:
+    # Mismo parseo que las vistas (force=True): un Content-Type distinto no esquiva el límite.
+    data = request.get_json(force=True, silent=True)
+    email = data.get("email") if isinstance(data, dict) else None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+_KEYS = {"ip": _client_ip, "email": _body_email}
+
+
+def rate_limit(route: str):
+    """Aplica los límites de ``Settings.RATE_LIMITS[route]`` antes de ejecutar la vista.
+
+    Va antes de cualquier acceso a BD o Argon2; responde 429 con Retry-After al agotar un bucket.
+    Si un bucket rechaza, se devuelven los tokens ya tomados de los demás: un email bloqueado no
+    consume el cupo de la IP.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if Settings.RATE_LIMIT_ENABLED:
+                taken = []
+                for kind, (capacity, period) in Settings.RATE_LIMITS.get(route, {}).items():
+                    value = _KEYS[kind]()
+                    if value is None:
+                        continue
+                    key = f"{route}:{kind}:{value}"
+                    wait = buckets.take(key, capacity, period)
+                    if wait:
+                        for k, cap in taken:
+                            buckets.refund(k, cap)
+                        RATE_LIMITED.labels(route, kind).inc()
+                        return jsonify(error="Demasiados intentos, reintente más tarde"), 429, \
+                            {"Retry-After": str(max(int(wait + 0.999), 1))}
+                    taken.append((key, capacity))
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,129 @@
+import math, time, hashlib, threading, datetime as dt
+from sqlalchemy import select
+from app.extensions import SessionLocal
+from app.models import TokenRevocation
+from config import Settings
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(capacity, 1)
+        self.bits = max(int(-self.capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.bits / self.capacity * math.log(2)), 1)
+        self._array = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, key: str):
+        # Doble hashing (Kirsch–Mitzenmacher): k posiciones a partir de un solo digest.
+        d = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(d[:8], "little"), int.from_bytes(d[8:], "little") | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for p in self._positions(key):
+            self._array[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._array[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+
+def _epoch(ts: dt.datetime) -> float:
+    return ts.replace(tzinfo=dt.timezone.utc).timestamp()
+
+
+class RevocationList:
+    """jti revocados y aún no vencidos: Bloom para el caso común (no revocado) + dict exacto.
+
+    Las revocaciones locales se aplican al confirmar; las de otros workers llegan con la
+    sincronización incremental por ``token_revocations.revoked_at``. Cada jti sale de la
+    lista cuando vence su token, así que el tamaño queda acotado por JWT_EXPIRES_MIN.
+    """
+
+    def __init__(self, sync_interval: float):
+        self._exact: dict[str, float] = {}
+        self._bloom = BloomFilter(1024)
+        self._lock = threading.Lock()
+        self._sync_interval = sync_interval
+        self._loaded = False
+        self._watermark = None
+        self._next_sync = 0.0
+        self._next_expiry = math.inf
+        self.db_checks = 0
+
+    def _ensure_fresh(self) -> None:
+        now = time.monotonic()
+        if now < self._next_sync:
+            return
+        with self._lock:
+            if now < self._next_sync:
+                return
+            # Sesión propia (no la del scoped_session) para no cerrar la del request en curso.
+            with SessionLocal.session_factory() as db:
+                q = select(TokenRevocation.jti, TokenRevocation.expires_at, TokenRevocation.revoked_at)
+                if not self._loaded:
+                    q = q.where(TokenRevocation.expires_at > dt.datetime.utcnow())
+                elif self._watermark is not None:
+                    # Se relee una ventana de SYNC_SKEW_S: una revocación con revoked_at anterior puede
+                    # confirmarse después de que otro worker ya sincronizó más allá. Re-agregar es idempotente.
+                    q = q.where(TokenRevocation.revoked_at >= self._watermark - dt.timedelta(seconds=Settings.SYNC_SKEW_S))
+                for jti, expires_at, revoked_at in db.execute(q):
+                    self._add(jti, _epoch(expires_at))
+                    if self._watermark is None or revoked_at > self._watermark:
+                        self._watermark = revoked_at
+            self._loaded = True
+            if time.time() >= self._next_expiry:
+                self._prune()
+            self._next_sync = now + self._sync_interval
+
+    def _add(self, jti: str, exp: float) -> None:
+        if exp <= time.time() or jti in self._exact:
+            return
+        self._exact[jti] = exp
+        self._next_expiry = min(self._next_expiry, exp)
+        if len(self._exact) > self._bloom.capacity:
+            self._rebuild()
+        else:
+            self._bloom.add(jti)
+
+    def _prune(self) -> None:
+        # Un Bloom no admite borrados: se reconstruye sólo con los jti aún vigentes.
+        now = time.time()
+        self._exact = {jti: exp for jti, exp in self._exact.items() if exp > now}
+        self._next_expiry = min(self._exact.values(), default=math.inf)
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        bloom = BloomFilter(max(2 * len(self._exact), 1024))
+        for jti in self._exact:
+            bloom.add(jti)
+        self._bloom = bloom
+
+    def add(self, jti: str, exp: float) -> None:
+        with self._lock:
+            self._add(jti, exp)
+
+    def is_revoked(self, jti: str) -> bool:
+        self._ensure_fresh()
+        if jti not in self._bloom:
+            return False
+        exp = self._exact.get(jti)
+        if exp is not None:
+            return exp > time.time()
+        # Falso positivo del Bloom (o un jti recién borrado del dict): se confirma contra la BD.
+        self.db_checks += 1
+        with SessionLocal.session_factory() as db:
+            expires_at = db.scalar(select(TokenRevocation.expires_at).where(TokenRevocation.jti == jti))
+        if expires_at is None:
+            return False
+        self.add(jti, _epoch(expires_at))
+        return _epoch(expires_at) > time.time()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._exact),
+            "bloom_bits": self._bloom.bits,
+            "bloom_hashes": self._bloom.hashes,
+            "db_checks": self.db_checks,
+        }
+
+
+revocations = RevocationList(Settings.REVOCATION_SYNC_S)
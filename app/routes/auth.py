@@ -1,14 +1,23 @@
 from flask import Blueprint, request, jsonify
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime
 from app.extensions import SessionLocal
-from app.models import User, AuthLocal
-from app.security import hash_password, verify_password, is_valid_password, is_adult, make_access_token
+from app.models import User, AuthLocal, FriendshipCounter, RefreshToken
+from app.search import index_user
+from app.ratelimit import rate_limit
+from app.security import (
+    hash_password, verify_password, needs_rehash, is_valid_password, is_adult, make_access_token,
+    refresh_digest, issue_refresh_token, revoke_refresh_family, revoke_access_token,
+)
+from app.revocations import revocations
+from app.availability import taken
+from app import serializers
 
 bp = Blueprint("auth", __name__)
 
 @bp.post("/auth/register")
+@rate_limit("auth.register")
 def register():
     data = request.get_json(force=True, silent=False)
     required = ["nombre", "apellido", "email", "fecha_nacimiento", "username", "password"]
@@ -34,21 +43,39 @@ def register():
         exists_username = db.execute(select(User.id).where(User.username == username)).first()
         if exists_username:
             return jsonify(error="Username ya registrado"), 409
+        password_hash = hash_password(data["password"])
         try:
             u = User(nombre=data["nombre"].strip(), apellido=data["apellido"].strip(), username=username, fecha_nacimiento=fecha,)
             db.add(u)
             db.flush()  
-            a = AuthLocal(user_id=u.id, email=email, password_hash=hash_password(data["password"]),)
+            a = AuthLocal(user_id=u.id, email=email, password_hash=password_hash,)
             db.add(a)
+            db.add(FriendshipCounter(user_id=u.id))
+            index_user(db, u.id, u.nombre, u.apellido, u.username, email)
             db.commit()
             db.refresh(u)
         except IntegrityError:
             db.rollback()
             return jsonify(error="Conflicto de unicidad"), 409
+        taken.add("username", username)
+        taken.add("email", email)
         return jsonify(user_uuid=u.user_uuid), 201
 
 
+@bp.get("/auth/availability")
+@rate_limit("auth.availability")
+def availability():
+    """Disponibilidad para el formulario de registro; sólo va a la BD si el filtro da posible acierto."""
+    values = {k: (request.args.get(k) or "").strip().lower() for k in ("username", "email")}
+    values = {k: v for k, v in values.items() if v}
+    if not values:
+        return jsonify(error="username o email requerido"), 400
+    body = {f"{k}_available": not taken.is_taken(k, v) for k, v in values.items()}
+    return jsonify(body), 200, {"Cache-Control": "no-store"}
+
+
 @bp.post("/auth/login")
+@rate_limit("auth.login")
 def login():
     data = request.get_json(force=True, silent=False)
 
@@ -58,24 +85,80 @@ def login():
     email = data["email"].strip().lower()
 
     with SessionLocal() as db:
-        a = db.execute(select(AuthLocal).where(AuthLocal.email == email)).scalars().first()
+        row = db.execute(
+            select(*serializers.LOGIN_COLUMNS, AuthLocal.id.label("auth_id"), AuthLocal.password_hash)
+            .join(User, User.id == AuthLocal.user_id)
+            .where(AuthLocal.email == email)
+        ).first()
 
-        if not a or not verify_password(data["password"], a.password_hash):
+        if not row or not verify_password(data["password"], row.password_hash):
             return jsonify(error="Credenciales inválidas"), 401
 
-        user = a.user
-        token = make_access_token(user.user_uuid)
-        me = {
-            "user_uuid": user.user_uuid,
-            "nombre": user.nombre,
-            "apellido": user.apellido,
-            "email": a.email,
-            "username": user.username,
-        }
-        
-        return jsonify(access_token=token, user=me), 200
+        if needs_rehash(row.password_hash):
+            db.execute(
+                update(AuthLocal).where(AuthLocal.id == row.auth_id)
+                .values(password_hash=hash_password(data["password"]))
+            )
+
+        token = make_access_token(row.user_uuid)
+        refresh = issue_refresh_token(db, row.id)
+        db.commit()
+        return jsonify(access_token=token, refresh_token=refresh, user=serializers.login_user(row)), 200
+
+
+@bp.post("/auth/refresh")
+def refresh():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get("refresh_token"), str):
+        return jsonify(error="refresh_token requerido"), 400
+
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        row = db.execute(
+            select(RefreshToken.id, RefreshToken.family_id, RefreshToken.user_id, RefreshToken.expires_at,
+                   RefreshToken.used_at, RefreshToken.revoked_at, User.user_uuid)
+            .join(User, User.id == RefreshToken.user_id)
+            .where(RefreshToken.token_hash == refresh_digest(data["refresh_token"]))
+        ).first()
+        if not row or row.revoked_at or row.expires_at <= now:
+            return jsonify(error="Refresh token inválido"), 401
+
+        # Marcar como usado es condicional: de dos canjes simultáneos del mismo token sólo uno gana.
+        claimed = row.used_at is None and db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.id == row.id, RefreshToken.used_at.is_(None))
+            .values(used_at=now)
+        ).rowcount == 1
+        if not claimed:
+            # Un token ya rotado volvió a usarse: alguien más lo tiene. Se corta toda la sesión.
+            revoke_refresh_family(db, row.family_id)
+            db.commit()
+            return jsonify(error="Refresh token reutilizado"), 401
+
+        new_refresh = issue_refresh_token(db, row.user_id, row.family_id)
+        db.commit()
+        return jsonify(access_token=make_access_token(row.user_uuid), refresh_token=new_refresh), 200
 
 
 @bp.post("/auth/logout")
 def logout():
+    data = request.get_json(silent=True)
+    if data is None:
+        data = {}
+    elif not isinstance(data, dict):
+        return jsonify(error="Body inválido"), 400
+    auth = request.headers.get("Authorization", "")
+    revoked = None
+    with SessionLocal() as db:
+        if auth.startswith("Bearer "):
+            revoked = revoke_access_token(db, auth.split(" ", 1)[1])
+        if isinstance(data.get("refresh_token"), str):
+            family_id = db.execute(
+                select(RefreshToken.family_id).where(RefreshToken.token_hash == refresh_digest(data["refresh_token"]))
+            ).scalar()
+            if family_id:
+                revoke_refresh_family(db, family_id)
+        db.commit()
+    if revoked:
+        revocations.add(*revoked)
     return jsonify(status="ok"), 200
@@ -1,8 +1,17 @@
-from flask import Blueprint, request, jsonify
-from sqlalchemy import select, or_
-from app.extensions import SessionLocal
-from app.models import User, Friendship
-from app.security import auth_required
+from datetime import datetime, timedelta
+from flask import Blueprint, Response, request, jsonify
+from sqlalchemy import select, func, or_, and_, union_all
+from sqlalchemy.exc import IntegrityError
+from app.extensions import SessionLocal, ReadSessionLocal
+from app.models import User, Friendship, FriendshipCounter
+from app.security import auth_required, principal_for_token
+from app import events as friend_events
+from app.pagination import encode_cursor, decode_cursor, parse_limit
+from app.graph import friend_graph
+from app.counters import apply_events, FIELDS as COUNTER_FIELDS
+from app.avatars import requested_avatar_size
+from app import serializers
+from config import Settings
 
 
 bp = Blueprint("friends", __name__)
@@ -15,136 +24,338 @@ def _norm(a:int, b:int) -> tuple[int,int]:
     return (a, b) if a < b else (b, a)
 
 
+def _friend_rows(db, me_id: int, limit: int, ascending: bool, *filters):
+    order = (Friendship.updated_at.asc(), Friendship.id.asc()) if ascending else (Friendship.updated_at.desc(), Friendship.id.desc())
+
+    def side(mine, theirs):
+        return select(
+            Friendship.id, Friendship.status, Friendship.requested_by_id,
+            Friendship.updated_at, theirs.label("other_id"),
+        ).where(mine == me_id, *filters).order_by(*order).limit(limit + 1).subquery()
+
+    # Cada lado recorre su propio índice (user_x_id, updated_at, id); la unión trae a lo sumo 2*(limit+1) filas.
+    low, high = side(Friendship.user_low_id, Friendship.user_high_id), side(Friendship.user_high_id, Friendship.user_low_id)
+    page = union_all(select(low), select(high)).subquery()
+    order = (page.c.updated_at.asc(), page.c.id.asc()) if ascending else (page.c.updated_at.desc(), page.c.id.desc())
+    rows = db.execute(
+        select(page, User.user_uuid, User.nombre, User.apellido, User.username)
+        .join(User, User.id == page.c.other_id)
+        .order_by(*order)
+        .limit(limit + 1)
+    ).all()
+    return rows[:limit], len(rows) > limit
+
+
+def _settled(db) -> datetime:
+    # Reloj del primario (el mismo que escribe updated_at) menos el margen para transacciones en curso.
+    return db.scalar(select(func.now())) - timedelta(seconds=Settings.FRIENDS_SYNC_SKEW_S)
+
+
+def _replicated(db) -> datetime:
+    # En una réplica no sirve su reloj: con lag, lo confirmado en el primario después de la última
+    # fila aplicada quedaría detrás del token. Se usa el updated_at más reciente que ya tiene.
+    latest = db.scalar(select(func.max(Friendship.updated_at)))
+    return latest - timedelta(seconds=Settings.FRIENDS_SYNC_SKEW_S) if latest else datetime(1970, 1, 1)
+
+
+def _sync_token(ts: datetime, row_id: int = 0, floor: datetime | None = None) -> str:
+    return encode_cursor("friends-sync", ts, row_id, *([floor.isoformat()] if floor else []))
+
+
 @bp.get("/friends")
 @auth_required
 def list_friends():
     status = request.args.get("status")
-    with SessionLocal() as db:
-        me = db.execute(select(User).where(User.user_uuid == request.user_uuid)).scalars().first()
-        if not me:
-            return jsonify(error="Not found"), 404
-        q = select(Friendship).where(or_(Friendship.user_low_id==me.id, Friendship.user_high_id==me.id))
+    try:
+        limit = parse_limit(50, 200)
+    except ValueError:
+        return jsonify(error="limit inválido"), 422
+    if "since" in request.args:
         if status:
-            q = q.where(Friendship.status == status)
-        rows = db.execute(q.order_by(Friendship.updated_at.desc())).scalars().all()
+            return jsonify(error="status no aplica con since"), 422
+        return _friends_delta(limit)
+    cursor = None
+    if request.args.get("cursor"):
+        cursor = decode_cursor("friends", request.args["cursor"])
+        if not cursor:
+            return jsonify(error="cursor inválido"), 422
 
-        def serialize(fs: Friendship):            
-            other_id = fs.user_high_id if fs.user_low_id == me.id else fs.user_low_id
-            other = db.get(User, other_id)
-            return {
-                "user_uuid": other.user_uuid,
-                "nombre": other.nombre,
-                "apellido": other.apellido,
-                "username": other.username,
-                "status": fs.status,
-                "requested_by_me": (fs.requested_by_id == me.id)
-            }
+    me = request.principal
+    with ReadSessionLocal() as db:
+        filters = [Friendship.status == status] if status else []
+        if cursor:
+            ts, last_id = cursor[:2]
+            filters.append(or_(Friendship.updated_at < ts,
+                               and_(Friendship.updated_at == ts, Friendship.id < last_id)))
+        # El sync_token viaja en el cursor: todas las páginas de un listado devuelven el de la primera.
+        synced = datetime.fromisoformat(cursor[2]) if cursor and len(cursor) > 2 else _replicated(db)
+        rows, has_more = _friend_rows(db, me.id, limit, False, *filters)
 
-        return jsonify(items=[serialize(fs) for fs in rows]), 200
+        items = [serializers.friend(r, me.id) for r in rows]
+        next_cursor = encode_cursor("friends", rows[-1].updated_at, rows[-1].id, synced.isoformat()) if has_more else None
+        return jsonify(items=items, paging={"next_cursor": next_cursor}, sync_token=_sync_token(synced)), 200
 
 
-@bp.post("/friends/request")
+def _friends_delta(limit: int):
+    """Filas cambiadas desde ``since`` en orden (updated_at, id), incluidas las pasadas a
+    ``removed``/``rejected``. ``since`` vacío arranca desde el principio.
+
+    El token es el keyset (updated_at, id) de la última fila. Al ponerse al día no avanza más
+    allá de ``FRIENDS_SYNC_SKEW_S`` antes del inicio de la sincronización, para no perder filas
+    de transacciones que confirmaron tarde con un updated_at anterior; lo reenviado se aplica igual.
+    Se lee del primario: en una réplica con lag mayor al margen se saltearían filas para siempre.
+    """
+    since = None
+    if request.args["since"]:
+        since = decode_cursor("friends-sync", request.args["since"])
+        if not since:
+            return jsonify(error="since inválido"), 422
+    me = request.principal
+    with SessionLocal() as db:
+        filters, floor = [], _settled(db)
+        if since:
+            ts, last_id, *extra = since
+            filters.append(or_(Friendship.updated_at > ts,
+                               and_(Friendship.updated_at == ts, Friendship.id > last_id)))
+            if extra:
+                floor = datetime.fromisoformat(extra[0])
+        rows, has_more = _friend_rows(db, me.id, limit, True, *filters)
+
+        ts, last_id = (rows[-1].updated_at, rows[-1].id) if rows else (since[:2] if since else (floor, 0))
+        if has_more:
+            token = _sync_token(ts, last_id, floor)
+        else:
+            token = _sync_token(ts, last_id) if ts < floor else _sync_token(floor)
+        items = [serializers.friend(r, me.id) for r in rows]
+        return jsonify(items=items, sync_token=token, has_more=has_more), 200
+
+
+@bp.get("/friends/summary")
 @auth_required
-def request_friend():
+def friends_summary():
+    with SessionLocal() as db:
+        row = db.get(FriendshipCounter, request.principal.id)
+        return jsonify({f: getattr(row, f) if row else 0 for f in COUNTER_FIELDS}), 200
+
+
+@bp.get("/friends/suggestions")
+@auth_required
+def friend_suggestions():
+    try:
+        limit = parse_limit(20, 50)
+    except ValueError:
+        return jsonify(error="limit inválido"), 422
+    me = request.principal
+    with SessionLocal() as db:
+        pending = db.execute(
+            select(Friendship.user_low_id, Friendship.user_high_id).where(
+                or_(Friendship.user_low_id == me.id, Friendship.user_high_id == me.id),
+                Friendship.status == "pending",
+            )
+        ).all()
+        exclude = {low if high == me.id else high for low, high in pending}
+        ranked = friend_graph.suggestions(me.id, limit, exclude)
+        if not ranked:
+            return jsonify(items=[]), 200
+        users = {r.id: r for r in db.execute(
+            select(*serializers.CARD_COLUMNS, User.id).where(User.id.in_([uid for uid, _ in ranked]))
+        )}
+        size = requested_avatar_size()
+        items = [
+            {**serializers.user_card(users[uid], size), "mutual_friends": mutual}
+            for uid, mutual in ranked if uid in users
+        ]
+        return jsonify(items=items), 200
+
+
+def event_token(headers, args) -> str | None:
+    # EventSource del navegador no permite headers propios: se acepta también ?access_token=.
+    auth = headers.get("Authorization", "")
+    return auth.split(" ", 1)[1] if auth.startswith("Bearer ") else args.get("access_token")
+
+
+@bp.get("/friends/events")
+def friend_events_stream():
+    """SSE de transiciones propias. En modo ASGI lo atiende el event loop (app/aio.py) y el stream
+    queda abierto. En WSGI no se retiene el worker: se responde lo pendiente desde Last-Event-ID
+    y se cierra, y el navegador se reconecta a los FRIEND_EVENTS_WSGI_RETRY_MS."""
+    token = event_token(request.headers, request.args)
+    me = principal_for_token(token) if token else None
+    if not me:
+        return jsonify(error="Unauthorized"), 401
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    body = friend_events.opening(me.id, last_event_id, friend_events.hub.tail(), Settings.FRIEND_EVENTS_WSGI_RETRY_MS)
+    return Response(body, mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# Transiciones de la máquina de estados. Cada una recibe la fila del par (o None), la muta
+# y registra un evento si hubo cambio; el llamador confirma una sola vez y luego publica.
+
+def _do_request(db, me_id: int, other_id: int, fs: Friendship | None, events: list):
+    if me_id == other_id:
+        return {"error": "No se permite self-request"}, 400
+    if not fs:
+        low, high = _norm(me_id, other_id)
+        db.add(Friendship(user_low_id=low, user_high_id=high, status="pending", requested_by_id=me_id))
+        events.append(("request", me_id, other_id))
+        return {"status": "pending"}, 201
+    if fs.status in ("rejected", "removed"):
+        fs.status = "pending"
+        fs.requested_by_id = me_id
+        events.append(("request", me_id, other_id))
+        return {"status": "pending"}, 200
+    return {"status": fs.status}, 200
+
+
+def _do_accept(db, me_id: int, other_id: int, fs: Friendship | None, events: list):
+    if not fs or fs.status != "pending":
+        return {"error": "No hay solicitud pendiente"}, 409
+    if me_id == fs.requested_by_id:
+        return {"error": "Solo el receptor puede aceptar"}, 403
+    fs.status = "accepted"
+    events.append(("accept", me_id, other_id))
+    return {"status": "accepted"}, 200
+
+
+def _do_reject(db, me_id: int, other_id: int, fs: Friendship | None, events: list):
+    if not fs or fs.status != "pending":
+        return {"error": "No hay solicitud pendiente"}, 409
+    if me_id == fs.requested_by_id:
+        return {"error": "Solo el receptor puede rechazar"}, 403
+    fs.status = "rejected"
+    events.append(("reject", me_id, other_id))
+    return {"status": "rejected"}, 200
+
+
+def _do_unfriend(db, me_id: int, other_id: int, fs: Friendship | None, events: list):
+    if not fs:
+        return {"status": "removed"}, 200
+    if fs.status == "accepted":
+        fs.status = "removed"
+        events.append(("unfriend", me_id, other_id))
+        return {"status": "removed"}, 200
+    return {"status": fs.status}, 200
+
+
+def _publish(events: list, uuids: dict[int, str]) -> None:
+    for kind, a, b in events:
+        if kind == "accept":
+            friend_graph.add(a, b)
+        elif kind == "unfriend":
+            friend_graph.remove(a, b)
+    if events:
+        friend_events.hub.publish(events, uuids)
+
+
+def _single(transition, key: str):
     data = request.get_json(force=True)
-    to_uuid = data.get("to_user_uuid")
-    if not to_uuid:
-        return jsonify(error="to_user_uuid requerido"), 400
+    other_uuid = data.get(key)
+    if not other_uuid:
+        return jsonify(error=f"{key} requerido"), 400
+    me = request.principal
+    events = []
     with SessionLocal() as db:
-        me = _by_uuid(db, request.user_uuid)
-        other = _by_uuid(db, to_uuid)
-        if not me or not other:
+        other = _by_uuid(db, other_uuid)
+        if not other:
             return jsonify(error="Not found"), 404
-        if me.id == other.id:
-            return jsonify(error="No se permite self-request"), 400
-        low, high = _norm(me.id, other.id)
+        other_id, other_uuid = other.id, other.user_uuid
+        low, high = _norm(me.id, other_id)
         fs = db.execute(select(Friendship).where(
             Friendship.user_low_id==low, Friendship.user_high_id==high
         )).scalars().first()
-        if not fs:
-            fs = Friendship(user_low_id=low, user_high_id=high, status="pending", requested_by_id=me.id)
-            db.add(fs)
-            db.commit()
-            return jsonify(status="pending"), 201
-        if fs.status in ("rejected", "removed"):
-            fs.status = "pending"
-            fs.requested_by_id = me.id
-            db.commit()
-            return jsonify(status="pending"), 200
+        body, code = transition(db, me.id, other_id, fs, events)
+        if events:
+            apply_events(db, events)
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                return jsonify(error="Conflicto de unicidad"), 409
+    _publish(events, {me.id: me.user_uuid, other_id: other_uuid})
+    return jsonify(body), code
+
+
+def _batch(transition, key: str):
+    data = request.get_json(force=True)
+    uuids = data.get(key) if isinstance(data, dict) else None
+    if not isinstance(uuids, list) or not uuids or not all(isinstance(u, str) for u in uuids):
+        return jsonify(error=f"{key} requerido"), 400
+    uuids = list(dict.fromkeys(uuids))
+    if len(uuids) > Settings.FRIENDS_BATCH_MAX:
+        return jsonify(error=f"Máximo {Settings.FRIENDS_BATCH_MAX} elementos"), 422
+    me = request.principal
+    events = []
+    with SessionLocal() as db:
+        ids = dict(db.execute(select(User.user_uuid, User.id).where(User.user_uuid.in_(uuids))).all())
+        others = list(ids.values())
+        pairs = {(fs.user_low_id, fs.user_high_id): fs for fs in db.execute(select(Friendship).where(or_(
+            and_(Friendship.user_low_id == me.id, Friendship.user_high_id.in_(others)),
+            and_(Friendship.user_high_id == me.id, Friendship.user_low_id.in_(others)),
+        ))).scalars()}
+        items = []
+        for other_uuid in uuids:
+            other_id = ids.get(other_uuid)
+            if other_id is None:
+                body, code = {"error": "Not found"}, 404
+            else:
+                body, code = transition(db, me.id, other_id, pairs.get(_norm(me.id, other_id)), events)
+            items.append({"user_uuid": other_uuid, "code": code, **body})
+        if events:
+            apply_events(db, events)
+            try:
+                db.commit()
+            except IntegrityError:
+                # Otro request creó uno de los pares en paralelo: no se aplica nada del lote.
+                db.rollback()
+                return jsonify(error="Conflicto de unicidad"), 409
+    _publish(events, {**{v: k for k, v in ids.items()}, me.id: me.user_uuid})
+    return jsonify(items=items), 200
+
 
-        return jsonify(status=fs.status), 200
+@bp.post("/friends/request")
+@auth_required
+def request_friend():
+    return _single(_do_request, "to_user_uuid")
 
 
 @bp.post("/friends/accept")
 @auth_required
 def accept_friend():
-    data = request.get_json(force=True)
-    from_uuid = data.get("user_uuid")
-    if not from_uuid:
-        return jsonify(error="user_uuid requerido"), 400
-    with SessionLocal() as db:
-        me = _by_uuid(db, request.user_uuid)
-        other = _by_uuid(db, from_uuid)
-        if not me or not other:
-            return jsonify(error="Not found"), 404
-        low, high = _norm(me.id, other.id)
-        fs = db.execute(select(Friendship).where(
-            Friendship.user_low_id==low, Friendship.user_high_id==high
-        )).scalars().first()
-        if not fs or fs.status != "pending":
-            return jsonify(error="No hay solicitud pendiente"), 409         
-        if me.id == fs.requested_by_id:
-            return jsonify(error="Solo el receptor puede aceptar"), 403
-        fs.status = "accepted"
-        db.commit()
-        return jsonify(status="accepted"), 200
+    return _single(_do_accept, "user_uuid")
 
 
 @bp.post("/friends/reject")
 @auth_required
 def reject_friend():
-    data = request.get_json(force=True)
-    from_uuid = data.get("user_uuid")
-    if not from_uuid:
-        return jsonify(error="user_uuid requerido"), 400
-    with SessionLocal() as db:
-        me = _by_uuid(db, request.user_uuid)
-        other = _by_uuid(db, from_uuid)
-        if not me or not other:
-            return jsonify(error="Not found"), 404
-        low, high = _norm(me.id, other.id)
-        fs = db.execute(select(Friendship).where(
-            Friendship.user_low_id==low, Friendship.user_high_id==high
-        )).scalars().first()
-        if not fs or fs.status != "pending":
-            return jsonify(error="No hay solicitud pendiente"), 409
-        if me.id == fs.requested_by_id:
-            return jsonify(error="Solo el receptor puede rechazar"), 403
-        fs.status = "rejected"
-        db.commit()
-        return jsonify(status="rejected"), 200
+    return _single(_do_reject, "user_uuid")
 
 
 @bp.post("/friends/unfriend")
 @auth_required
 def unfriend():
-    data = request.get_json(force=True)
-    user_uuid = data.get("user_uuid")
-    if not user_uuid:
-        return jsonify(error="user_uuid requerido"), 400
-    with SessionLocal() as db:
-        me = _by_uuid(db, request.user_uuid)
-        other = _by_uuid(db, user_uuid)
-        if not me or not other:
-            return jsonify(error="Not found"), 404  
-        low, high = _norm(me.id, other.id)
-        fs = db.execute(select(Friendship).where(
-            Friendship.user_low_id==low, Friendship.user_high_id==high
-        )).scalars().first()
-        if not fs:
-            return jsonify(status="removed"), 200  
-        if fs.status == "accepted":
-            fs.status = "removed"
-            db.commit()
-            return jsonify(status="removed"), 200
-        return jsonify(status=fs.status), 200
+    return _single(_do_unfriend, "user_uuid")
+
+
+@bp.post("/friends/request/batch")
+@auth_required
+def request_friend_batch():
+    return _batch(_do_request, "to_user_uuids")
+
+
+@bp.post("/friends/accept/batch")
+@auth_required
+def accept_friend_batch():
+    return _batch(_do_accept, "user_uuids")
+
+
+@bp.post("/friends/reject/batch")
+@auth_required
+def reject_friend_batch():
+    return _batch(_do_reject, "user_uuids")
+
+
+@bp.post("/friends/unfriend/batch")
+@auth_required
+def unfriend_batch():
+    return _batch(_do_unfriend, "user_uuids")
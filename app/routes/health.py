@@ -1,7 +1,35 @@
 from flask import Blueprint, jsonify
+from sqlalchemy import text
+from app.extensions import engine, pool_stats
+from app.security import auth_cache_stats
+from app.profiles import profile_cache
+from app.uploads import hot_cache_stats
+from app.availability import taken
 
 bp = Blueprint("health", __name__)
 
 @bp.get("/health")
 def health():
     return jsonify(status="ok"), 200
+
+
+@bp.get("/health/db")
+def health_db():
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return jsonify(status="ok"), 200
+
+
+@bp.get("/health/caches")
+def cache_stats():
+    return jsonify(
+        profiles=profile_cache.stats(),
+        **auth_cache_stats(),
+        uploads=hot_cache_stats(),
+        availability=taken.stats(),
+    ), 200
+
+
+@bp.get("/health/pool")
+def db_pool_stats():
+    return jsonify(pool_stats()), 200
@@ -1,37 +1,35 @@
-import os, uuid, datetime as dt
-from flask import Blueprint, request, jsonify
-from sqlalchemy import select
+import os, hashlib, datetime as dt
+from flask import Blueprint, request, jsonify, make_response
+from sqlalchemy import select, or_, and_
 from sqlalchemy.exc import IntegrityError
-from app.extensions import SessionLocal
+from werkzeug.exceptions import RequestEntityTooLarge
+from app.extensions import SessionLocal, ReadSessionLocal
 from app.models import User, AuthLocal
-from app.security import hash_password, is_valid_password, is_adult, auth_required
+from app.security import hash_password, is_valid_password, is_adult, auth_required, invalidate_principal, optional_principal
+from app.graph import friend_graph
+from app.search import search_stmt, index_user
+from app.avatars import store_upload, schedule_variants, avatar_url, requested_avatar_size, AvatarError
+from app.profiles import profile_cache, profile_etag, invalidate_profile
+from app.availability import taken
+from app import serializers
+from app.pagination import encode_cursor, decode_cursor, parse_limit
 from config import Settings
-from sqlalchemy import or_
 
 bp = Blueprint("users", __name__)
 
-def _me(db, user_uuid: str) -> User | None:
-    return db.execute(select(User).where(User.user_uuid == user_uuid)).scalars().first()
-
-
 @bp.get("/users/me")
 @auth_required
 def me():
-    with SessionLocal() as db:
-        u = _me(db, request.user_uuid)
-        if not u:
+    size = requested_avatar_size()
+    with ReadSessionLocal() as db:
+        row = db.execute(
+            select(*serializers.ME_COLUMNS)
+            .outerjoin(AuthLocal, AuthLocal.user_id == User.id)
+            .where(User.id == request.principal.id)
+        ).first()
+        if not row:
             return jsonify(error="Not found"), 404
-        a = db.execute(select(AuthLocal).where(AuthLocal.user_id == u.id)).scalars().first()
-        return jsonify({
-            "user_uuid": u.user_uuid,
-            "nombre": u.nombre,
-            "apellido": u.apellido,
-            "email": a.email if a else None,
-            "username": u.username,
-            "avatar_url": f"/{u.avatar_path}" if u.avatar_path else None,
-            "fecha_nacimiento": u.fecha_nacimiento.isoformat(),
-            "created_at": u.created_at.isoformat()
-        }), 200
+        return jsonify(serializers.me(row, size)), 200
 
 
 @bp.patch("/users/me")
@@ -44,7 +42,7 @@ def me_update():
         return jsonify(error=f"Campos no permitidos: {', '.join(sorted(unknown))}"), 422
 
     with SessionLocal() as db:
-        u = _me(db, request.user_uuid)
+        u = db.get(User, request.principal.id)
         if not u:
             return jsonify(error="Not found"), 404
         a = db.execute(select(AuthLocal).where(AuthLocal.user_id == u.id)).scalars().first()
@@ -84,64 +82,135 @@ def me_update():
                 return jsonify(error="Password no cumple política"), 422
             a.password_hash = hash_password(data["password"])
 
+        if {"nombre", "apellido", "username", "email"} & data.keys():
+            index_user(db, u.id, u.nombre, u.apellido, u.username, a.email if a else None)
+
         try:
             db.commit()
         except IntegrityError:
             db.rollback()
             return jsonify(error="Conflicto de unicidad"), 409
 
+        invalidate_principal(u.user_uuid)
+        invalidate_profile(u.user_uuid)
+        taken.add("username", u.username)
+        if a:
+            taken.add("email", a.email)
         return jsonify(status="ok"), 200
 
 
 @bp.patch("/users/me/avatar")
 @auth_required
 def me_avatar():
-    if "avatar" not in request.files:
-        return jsonify(error="Falta archivo 'avatar'"), 400
+    max_bytes = Settings.MAX_AVATAR_MB * 1024 * 1024
+    # Werkzeug corta el cuerpo al superar el límite mientras lo lee, incluso sin Content-Length.
+    request.max_content_length = max_bytes + 64 * 1024
+    try:
+        if "avatar" not in request.files:
+            return jsonify(error="Falta archivo 'avatar'"), 400
+    except RequestEntityTooLarge:
+        return jsonify(error="Archivo excede tamaño máximo"), 413
     f = request.files["avatar"]
 
     if not f.mimetype or not f.mimetype.startswith("image/"):
         return jsonify(error="MIME no permitido"), 422
-    max_bytes = Settings.MAX_AVATAR_MB * 1024 * 1024
-    content_len = request.content_length or 0
-    if content_len > max_bytes:
-        return jsonify(error="Archivo excede tamaño máximo"), 413
 
     ext = (os.path.splitext(f.filename)[1] or "").lower()
     if ext not in [".jpg",".jpeg",".png",".gif",".webp"]:
         return jsonify(error="Extensión no permitida"), 422
 
-    today = dt.date.today()
-    rel_dir = os.path.join(Settings.UPLOAD_ROOT, f"{today.year}", f"{today.month:02d}")
-    os.makedirs(rel_dir, exist_ok=True)
-    filename = f"{uuid.uuid4()}{ext}"
-    rel_path = os.path.join(rel_dir, filename)
+    try:
+        rel_path = store_upload(f.stream, max_bytes)
+    except AvatarError as e:
+        return jsonify(error=e.message), e.status
 
     with SessionLocal() as db:
-        u = _me(db, request.user_uuid)
+        u = db.get(User, request.principal.id)
         if not u:
             return jsonify(error="Not found"), 404
-        f.save(rel_path)
-        u.avatar_path = rel_path.replace("\\", "/")
+        u.avatar_path = rel_path
         db.commit()
+    invalidate_profile(request.user_uuid)
+
+    schedule_variants(rel_path)
+    return jsonify(avatar_url=avatar_url(rel_path)), 200
+
 
-        return jsonify(avatar_url=f"/{u.avatar_path}"), 200
+def _profiles(uuids: list[str]) -> dict[str, tuple]:
+    """uuid -> (etag, perfil, user_id) desde profile_cache; los que faltan, en un solo IN."""
+    found = {}
+    for user_uuid in uuids:
+        cached = profile_cache.get(user_uuid)
+        if cached is not None:
+            found[user_uuid] = cached
+    misses = [u for u in uuids if u not in found]
+    if misses:
+        with ReadSessionLocal() as db:
+            for row in db.execute(select(*serializers.PROFILE_COLUMNS).where(User.user_uuid.in_(misses))):
+                found[row.user_uuid] = cached = (profile_etag(row), serializers.profile(row), row.id)
+                profile_cache.set(row.user_uuid, cached)
+    return found
+
+
+def _public(cached: tuple, viewer, size: int | None) -> tuple[str, dict]:
+    """ETag y cuerpo público de un perfil; con sesión agrega amigos en común (del grafo, sin SQL)."""
+    etag, profile, user_id = cached
+    body = {k: v for k, v in profile.items() if k != "avatar_path"}
+    body["avatar_url"] = avatar_url(profile["avatar_path"], size)
+    if viewer and viewer.id != user_id:
+        body["mutual_friends"] = mutual = friend_graph.mutual_count(viewer.id, user_id)
+        etag = f"{etag}-{mutual}"
+    return etag, body
+
+
+def _conditional(etag: str, build):
+    resp = make_response("", 304) if request.if_none_match.contains(etag) else jsonify(build())
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.vary.add("Authorization")
+    return resp
 
 
 @bp.get("/users/<user_uuid>")
 def user_public(user_uuid: str):
-    with SessionLocal() as db:
-        u = db.execute(select(User).where(User.user_uuid == user_uuid)).scalars().first()
-        if not u:
-            return jsonify(error="Not found"), 404
-        return jsonify({
-            "user_uuid": u.user_uuid,
-            "nombre": u.nombre,
-            "apellido": u.apellido,
-            "username": u.username,
-            "avatar_url": f"/{u.avatar_path}" if u.avatar_path else None,
-            "created_at": u.created_at.isoformat()
-        }), 200
+    cached = _profiles([user_uuid]).get(user_uuid)
+    if cached is None:
+        return jsonify(error="Not found"), 404
+    etag, body = _public(cached, optional_principal(), requested_avatar_size())
+    return _conditional(etag, lambda: body)
+
+
+@bp.get("/users")
+@bp.post("/users/lookup")
+def users_batch():
+    """Perfiles públicos de varios uuids (``?uuids=a,b,c`` o ``{"uuids": [...]}``) en un request."""
+    if request.method == "POST":
+        data = request.get_json(force=True, silent=True)
+        uuids = data.get("uuids") if isinstance(data, dict) else None
+    else:
+        uuids = [u for u in (request.args.get("uuids") or "").split(",") if u]
+    if not isinstance(uuids, list) or not uuids or not all(isinstance(u, str) for u in uuids):
+        return jsonify(error="uuids requerido"), 400
+    uuids = list(dict.fromkeys(u.strip() for u in uuids))
+    if len(uuids) > Settings.PROFILE_BATCH_MAX:
+        return jsonify(error=f"Máximo {Settings.PROFILE_BATCH_MAX} elementos"), 422
+
+    found = _profiles(uuids)
+    viewer, size = optional_principal(), requested_avatar_size()
+    items, etags = {}, []
+    for user_uuid in uuids:
+        if user_uuid in found:
+            etag, items[user_uuid] = _public(found[user_uuid], viewer, size)
+            etags.append(etag)
+    missing = [u for u in uuids if u not in found]
+    # ETag del lote: los de cada perfil, los ausentes y el tamaño de avatar pedido.
+    raw = "\x1f".join([",".join(uuids), *etags, ",".join(missing), str(size)])
+    etag = hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+    if request.method == "POST":
+        resp = jsonify(items=items, missing=missing)
+        resp.set_etag(etag)
+        return resp
+    return _conditional(etag, lambda: {"items": items, "missing": missing})
 
 
 @bp.get("/users/search")
@@ -150,39 +219,48 @@ def users_search():
     if not q:
         return jsonify(items=[], paging={"next_cursor": None}), 200
     try:
-        limit = min(int(request.args.get("limit", 20)), 50)
+        limit = parse_limit(20, 50)
         offset = max(int(request.args.get("offset", 0)), 0)
     except ValueError:
         return jsonify(error="limit/offset inválidos"), 422
+    legacy = "offset" in request.args
+    if legacy and request.args.get("cursor"):
+        return jsonify(error="cursor y offset son excluyentes"), 422
+    # El cursor queda atado a la consulta: no se puede reutilizar con otro q.
+    scope = f"search:{q.lower()}"
+    cursor = None
+    if request.args.get("cursor"):
+        cursor = decode_cursor(scope, request.args["cursor"])
+        if not cursor:
+            return jsonify(error="cursor inválido"), 422
 
-    term = f"%{q.lower()}%"
-    with SessionLocal() as db:
-        stmt = (
-            select(User)
-            .outerjoin(AuthLocal, AuthLocal.user_id == User.id)
-            .where(
-                or_(
-                    User.nombre.ilike(term),
-                    User.apellido.ilike(term),
-                    User.username.ilike(term),
-                    AuthLocal.email.ilike(term),
-                )
-            )
-            .order_by(User.created_at.desc())
-            .limit(limit + 1)
-            .offset(offset)
-        )
-        rows = db.execute(stmt).scalars().all()
+    stmt, score = search_stmt(q, *serializers.CARD_COLUMNS, User.created_at, User.id)
+    if stmt is None:
+        return jsonify(items=[], paging={"next_cursor": None}), 200
+    with ReadSessionLocal() as db:
+        if cursor:
+            ts, last_id, last_score = cursor
+            stmt = stmt.where(or_(
+                score < last_score,
+                and_(score == last_score, or_(
+                    User.created_at < ts,
+                    and_(User.created_at == ts, User.id < last_id),
+                )),
+            ))
+        stmt = stmt.order_by(score.desc(), User.created_at.desc(), User.id.desc()).limit(limit + 1)
+        if legacy:
+            stmt = stmt.offset(offset)
+        rows = db.execute(stmt).all()
         has_more = len(rows) > limit
-        users = rows[:limit]
-
-        items = [{
-            "user_uuid": u.user_uuid,
-            "nombre": u.nombre,
-            "apellido": u.apellido,
-            "username": u.username,
-            "avatar_url": f"/{u.avatar_path}" if u.avatar_path else None,
-        } for u in users]
+        rows = rows[:limit]
+        size = requested_avatar_size()
+        items = [serializers.user_card(r, size) for r in rows]
 
-        next_cursor = offset + limit if has_more else None
+        if not has_more:
+            next_cursor = None
+        elif legacy:
+            next_cursor = offset + limit
+        else:
+            last = rows[-1]
+            next_cursor = encode_cursor(scope, last.created_at, last.id, int(last.score))
         return jsonify(items=items, paging={"next_cursor": next_cursor}), 200
\ No newline at end of file
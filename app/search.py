@@ -0,0 +1,72 @@
+import re, operator, unicodedata
+from functools import reduce
+from sqlalchemy import select, delete, insert, and_
+from sqlalchemy.orm import aliased
+from app.models import User, UserSearchTerm
+from config import Settings
+
+
+# Peso por campo: un match en username pesa más que en nombre/apellido, y éstos más que en email.
+WEIGHTS = {"username": 3, "nombre": 2, "apellido": 2, "email": 1}
+MAX_QUERY_TERMS = 12
+
+# Letras y dígitos de cualquier alfabeto; "_", "." y "@" separan palabras.
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def normalize(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def _word_terms(word: str, for_query: bool) -> set[str]:
+    # Palabras de 1-2 caracteres se buscan por prefijo de palabra ("^a", "^ab"), no como
+    # subcadena: "ce" encuentra "cecilia" pero no "alice". El resto, por trigramas.
+    if len(word) < 3:
+        return {"^" + word}
+    grams = {word[i:i + 3] for i in range(len(word) - 2)}
+    if not for_query:
+        grams |= {"^" + word[:1], "^" + word[:2]}
+    return grams
+
+
+def terms_for(text: str, for_query: bool = False) -> set[str]:
+    out = set()
+    for word in _WORD_RE.findall(normalize(text)):
+        out |= _word_terms(word, for_query)
+    return out
+
+
+def build_terms(user_id: int, nombre: str, apellido: str, username: str, email: str | None) -> list[dict]:
+    weights: dict[str, int] = {}
+    for field, value in (("username", username), ("nombre", nombre), ("apellido", apellido), ("email", email)):
+        for t in terms_for(value or ""):
+            weights[t] = max(weights.get(t, 0), WEIGHTS[field])
+    return [{"term": t, "user_id": user_id, "weight": w} for t, w in weights.items()]
+
+
+def index_user(db, user_id: int, nombre: str, apellido: str, username: str, email: str | None) -> None:
+    db.execute(delete(UserSearchTerm).where(UserSearchTerm.user_id == user_id))
+    rows = build_terms(user_id, nombre, apellido, username, email)
+    if rows:
+        db.execute(insert(UserSearchTerm), rows)
+
+
+def search_stmt(q: str, *columns):
+    """``columns`` de los usuarios que contienen todos los términos de ``q``, más su puntaje.
+
+    Cada término es un join por la PK ``(term, user_id)`` y los candidatos se toman del más nuevo
+    al más viejo (``user_id`` desc) hasta SEARCH_MAX_CANDIDATES, así que un trigrama común no
+    obliga a agrupar toda su lista. El ranking y la paginación operan sobre ese conjunto: cada
+    página cuesta lo mismo que la primera y las coincidencias más viejas no se devuelven.
+    """
+    terms = sorted(terms_for(q[:64], for_query=True))[:MAX_QUERY_TERMS]
+    if not terms:
+        return None, None
+    postings = [aliased(UserSearchTerm) for _ in terms]
+    first = postings[0]
+    candidates = select(first.user_id, reduce(operator.add, (p.weight for p in postings)).label("score")).where(first.term == terms[0])
+    for p, term in zip(postings[1:], terms[1:]):
+        candidates = candidates.join(p, and_(p.term == term, p.user_id == first.user_id))
+    candidates = candidates.order_by(first.user_id.desc()).limit(Settings.SEARCH_MAX_CANDIDATES).subquery()
+    return select(*columns, candidates.c.score).join_from(User, candidates, candidates.c.user_id == User.id), candidates.c.score
@@ -1,27 +1,129 @@
-import re, datetime as dt, jwt
+import os, re, time, uuid, secrets, hashlib, threading, datetime as dt, jwt
+from typing import NamedTuple
+from concurrent.futures import TimeoutError as FutureTimeout
 from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError
+from sqlalchemy import select, update
 from config import Settings
+from app.cache import TTLCache
+from app.metrics import ARGON2_SECONDS
+from app.extensions import SessionLocal
+from app.models import User, RefreshToken, TokenRevocation
+from app.revocations import revocations
 
 from functools import wraps
 from flask import request, jsonify
 
 
-ph = PasswordHasher()
+ph = PasswordHasher(
+    time_cost=Settings.ARGON2_TIME_COST,
+    memory_cost=Settings.ARGON2_MEMORY_COST_KIB,
+    parallelism=Settings.ARGON2_PARALLELISM,
+)
 
 PWD_RE = re.compile(r"^(?=.*[a-z])(?=.*[A-Z])(?=.*\d)(?=.*[^A-Za-z0-9]).{7,}$")
 
 
-def hash_password(pw: str) -> str:
+class PasswordBusy(Exception):
+    """La cola de hashing está llena o no respondió a tiempo; se responde 503."""
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(Settings.PASSWORD_MAX_PENDING)
+
+
+def _watch_parent(parent_pid: int) -> None:
+    # Si el worker muere por una señal (p. ej. uvicorn re-emite SIGTERM al salir) el executor no
+    # llega a cerrar sus procesos; sin esto quedarían huérfanos con el socket heredado abierto.
+    def watch():
+        while os.getppid() == parent_pid:
+            time.sleep(1)
+        os._exit(0)
+    threading.Thread(target=watch, daemon=True).start()
+
+
+def _executor():
+    # Se crea perezosamente para que cada worker de gunicorn tenga su propio pool tras el fork.
+    global _pool
+    if _pool is None and Settings.PASSWORD_POOL_WORKERS > 0:
+        with _pool_lock:
+            if _pool is None:
+                from concurrent.futures import ProcessPoolExecutor
+                _pool = ProcessPoolExecutor(
+                    max_workers=Settings.PASSWORD_POOL_WORKERS, initializer=_watch_parent, initargs=(os.getpid(),)
+                )
+    return _pool
+
+
+def reset_after_fork() -> None:
+    """El pool y el semáforo del master no sirven en un worker forkeado: se rearman vacíos."""
+    global _pool, _pool_lock, _slots
+    _pool = None
+    _pool_lock = threading.Lock()
+    _slots = threading.BoundedSemaphore(Settings.PASSWORD_MAX_PENDING)
+
+
+def _run_password_task(fn, *args):
+    slots = _slots
+    if not slots.acquire(blocking=False):
+        raise PasswordBusy()
+    started = time.perf_counter()
+    try:
+        pool = _executor()
+        if pool is None:
+            try:
+                return fn(*args)
+            finally:
+                slots.release()
+        try:
+            future = pool.submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        # El cupo se libera cuando el hash termina de verdad: cancel() no detiene uno ya en curso
+        # y, si se liberara al vencer el timeout, el trabajo encolado superaría PASSWORD_MAX_PENDING.
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=Settings.PASSWORD_TIMEOUT_S)
+        except FutureTimeout:
+            future.cancel()
+            raise PasswordBusy()
+    finally:
+        ARGON2_SECONDS.labels(fn.__name__.lstrip("_")).observe(time.perf_counter() - started)
+
+
+def _hash(pw: str) -> str:
     return ph.hash(pw)
 
 
-def verify_password(pw: str, hashed: str) -> bool:
+def _verify(hashed: str, pw: str) -> bool:
     try:
         return ph.verify(hashed, pw)
     except Exception:
         return False
 
 
+def hash_password(pw: str) -> str:
+    return _run_password_task(_hash, pw)
+
+
+def verify_password(pw: str, hashed: str) -> bool:
+    return _run_password_task(_verify, hashed, pw)
+
+
+def hash_passwords(passwords: list[str], executor, chunksize: int = 1) -> list[str]:
+    """Hashea en lote sobre un executor propio del llamador (importaciones, scripts)."""
+    return list(executor.map(_hash, passwords, chunksize=chunksize))
+
+
+def needs_rehash(hashed: str) -> bool:
+    try:
+        return ph.check_needs_rehash(hashed)
+    except InvalidHashError:
+        return False
+
+
 def is_valid_password(pw: str) -> bool:
     return bool(PWD_RE.match(pw))
 
@@ -39,16 +141,115 @@ def make_access_token(user_uuid: str) -> str:
         "iat": int(now.timestamp()),
         "exp": int((now + dt.timedelta(minutes=Settings.JWT_EXPIRES_MIN)).timestamp()),
         "type": "access",
+        "jti": uuid.uuid4().hex,
     }
     return jwt.encode(payload, Settings.JWT_SECRET, algorithm="HS256")
 
 
+def refresh_digest(token: str) -> str:
+    # El token es aleatorio de 256 bits: basta un hash rápido, sin sal ni Argon2.
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_refresh_token(db, user_id: int, family_id: str | None = None) -> str:
+    """Agrega un refresh token (nueva familia si no se indica) a la sesión; el llamador confirma."""
+    token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        user_id=user_id,
+        family_id=family_id or str(uuid.uuid4()),
+        token_hash=refresh_digest(token),
+        expires_at=dt.datetime.utcnow() + dt.timedelta(days=Settings.REFRESH_EXPIRES_DAYS),
+    ))
+    return token
+
+
+def revoke_refresh_family(db, family_id: str) -> None:
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=dt.datetime.utcnow())
+    )
+
+
+class Principal(NamedTuple):
+    id: int
+    user_uuid: str
+    username: str
+
+
+# Tokens ya verificados, por digest -> (sub, jti); cada entrada vence con el exp del token.
+_token_cache = TTLCache(Settings.TOKEN_CACHE_SIZE)
+# uuid -> Principal. Acotado por TTL porque otros workers no ven las invalidaciones locales.
+_principal_cache = TTLCache(Settings.PRINCIPAL_CACHE_SIZE, ttl=Settings.PRINCIPAL_CACHE_TTL_S)
+
+
 def decode_access_token(token: str) -> str | None:
-    try:   
-        payload = jwt.decode(token, Settings.JWT_SECRET, algorithms=["HS256"])      
-        return payload.get("sub")
+    digest = hashlib.sha256(token.encode()).digest()
+    cached = _token_cache.get(digest)
+    if cached is None:
+        try:
+            payload = jwt.decode(token, Settings.JWT_SECRET, algorithms=["HS256"])
+        except Exception:
+            return None
+        if not payload.get("sub"):
+            return None
+        cached = (payload["sub"], payload.get("jti"))
+        _token_cache.set(digest, cached, expires_at=payload["exp"])
+    # La revocación se consulta también en los aciertos de caché: un logout no espera al exp.
+    sub, jti = cached
+    if jti and revocations.is_revoked(jti):
+        return None
+    return sub
+
+
+def revoke_access_token(db, token: str) -> tuple[str, int] | None:
+    """Registra el jti del token en la sesión; tras el commit hay que publicarlo con ``revocations.add``."""
+    try:
+        payload = jwt.decode(token, Settings.JWT_SECRET, algorithms=["HS256"])
     except Exception:
         return None
+    if not payload.get("jti"):
+        return None
+    expires_at = dt.datetime.fromtimestamp(payload["exp"], dt.timezone.utc).replace(tzinfo=None)
+    if not db.scalar(select(TokenRevocation.id).where(TokenRevocation.jti == payload["jti"])):
+        db.add(TokenRevocation(jti=payload["jti"], expires_at=expires_at))
+    return payload["jti"], payload["exp"]
+
+
+def load_principal(user_uuid: str) -> Principal | None:
+    p = _principal_cache.get(user_uuid)
+    if p is not None:
+        return p
+    with SessionLocal() as db:
+        row = db.execute(
+            select(User.id, User.user_uuid, User.username).where(User.user_uuid == user_uuid)
+        ).first()
+    if not row:
+        return None
+    p = Principal(row.id, row.user_uuid, row.username)
+    _principal_cache.set(user_uuid, p)
+    return p
+
+
+def invalidate_principal(user_uuid: str) -> None:
+    _principal_cache.pop(user_uuid)
+
+
+def auth_cache_stats() -> dict:
+    return {"tokens": _token_cache.stats(), "principals": _principal_cache.stats(), "revocations": revocations.stats()}
+
+
+def principal_for_token(token: str) -> Principal | None:
+    sub = decode_access_token(token)
+    return load_principal(sub) if sub else None
+
+
+def optional_principal() -> Principal | None:
+    """Principal del request si trae un Bearer válido; None si es anónimo."""
+    auth = request.headers.get("Authorization", "")
+    if not auth.startswith("Bearer "):
+        return None
+    return principal_for_token(auth.split(" ", 1)[1])
 
 
 def auth_required(fn):
@@ -60,6 +261,10 @@ def auth_required(fn):
         sub = decode_access_token(auth.split(" ", 1)[1])
         if not sub:
             return jsonify(error="Unauthorized"), 401
+        principal = load_principal(sub)
+        if not principal:
+            return jsonify(error="Unauthorized"), 401
         request.user_uuid = sub  
+        request.principal = principal
         return fn(*args, **kwargs)
     return wrapper
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""Proyecciones de columnas y serializadores de respuesta.
+
+Cada vista consulta sólo las columnas de su proyección (filas Core, sin identity map ni
+tracking de cambios) y arma el dict con ``zip`` sobre una tupla de claves fija, sin pasar
+por entidades ORM. ``JSON_PROVIDER=orjson`` cambia el encoder de ``jsonify`` por orjson.
+"""
+import decimal
+from flask.json.provider import JSONProvider, DefaultJSONProvider
+from app.models import User, AuthLocal
+from app.avatars import avatar_url
+from config import Settings
+
+# Tarjeta de usuario usada en búsquedas, sugerencias y listados.
+CARD_COLUMNS = (User.user_uuid, User.nombre, User.apellido, User.username, User.avatar_path)
+_CARD_KEYS = ("user_uuid", "nombre", "apellido", "username", "avatar_url")
+
+ME_COLUMNS = (
+    User.user_uuid, User.nombre, User.apellido, AuthLocal.email, User.username,
+    User.avatar_path, User.fecha_nacimiento, User.created_at,
+)
+_ME_KEYS = ("user_uuid", "nombre", "apellido", "email", "username", "avatar_url", "fecha_nacimiento", "created_at")
+
+# Perfil público: además de los campos visibles, lo que necesita profile_etag.
+PROFILE_COLUMNS = (
+    User.id, User.user_uuid, User.nombre, User.apellido, User.username,
+    User.avatar_path, User.created_at, User.updated_at,
+)
+_PROFILE_KEYS = ("user_uuid", "nombre", "apellido", "username", "avatar_path", "created_at")
+
+LOGIN_COLUMNS = (User.id, User.user_uuid, User.nombre, User.apellido, AuthLocal.email, User.username)
+_LOGIN_KEYS = ("user_uuid", "nombre", "apellido", "email", "username")
+
+_FRIEND_KEYS = ("user_uuid", "nombre", "apellido", "username", "status", "requested_by_me")
+
+
+def user_card(row, size: int | None = None) -> dict:
+    user_uuid, nombre, apellido, username, avatar_path = row[:5]
+    return dict(zip(_CARD_KEYS, (user_uuid, nombre, apellido, username, avatar_url(avatar_path, size))))
+
+
+def me(row, size: int | None = None) -> dict:
+    user_uuid, nombre, apellido, email, username, avatar_path, fecha_nacimiento, created_at = row[:8]
+    return dict(zip(_ME_KEYS, (
+        user_uuid, nombre, apellido, email, username, avatar_url(avatar_path, size),
+        fecha_nacimiento.isoformat(), created_at.isoformat(),
+    )))
+
+
+def profile(row) -> dict:
+    _, user_uuid, nombre, apellido, username, avatar_path, created_at = row[:7]
+    return dict(zip(_PROFILE_KEYS, (user_uuid, nombre, apellido, username, avatar_path, created_at.isoformat())))
+
+
+def login_user(row) -> dict:
+    return dict(zip(_LOGIN_KEYS, row[1:6]))
+
+
+def friend(row, me_id: int) -> dict:
+    return dict(zip(_FRIEND_KEYS, (
+        row.user_uuid, row.nombre, row.apellido, row.username, row.status, row.requested_by_id == me_id,
+    )))
+
+
+class OrjsonProvider(JSONProvider):
+    """``jsonify``/``request.get_json`` sobre orjson: serializa directo a bytes UTF-8."""
+
+    def __init__(self, app):
+        import orjson
+        super().__init__(app)
+        self._orjson = orjson
+        self._option = orjson.OPT_NON_STR_KEYS
+
+    @staticmethod
+    def _default(o):
+        if isinstance(o, decimal.Decimal):
+            return str(o)
+        if hasattr(o, "__html__"):
+            return str(o.__html__())
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+    def dumps(self, obj, **kwargs) -> str:
+        return self._orjson.dumps(obj, default=self._default, option=self._option).decode()
+
+    def loads(self, s, **kwargs):
+        return self._orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            self._orjson.dumps(obj, default=self._default, option=self._option), mimetype="application/json"
+        )
+
+
+def json_provider_class() -> type[JSONProvider]:
+    if Settings.JSON_PROVIDER == "orjson":
+        try:
+            import orjson  # noqa: F401
+            return OrjsonProvider
+        except ImportError:
+            pass
+    return DefaultJSONProvider
@@ -0,0 +1,69 @@
+import os, hashlib, mimetypes
+from flask import request, send_file, abort, Response
+from werkzeug.security import safe_join
+from app.cache import ByteLRU
+from config import Settings
+
+# Los nombres de archivo son UUID que nunca se reescriben: se pueden cachear para siempre.
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_hot = ByteLRU(Settings.UPLOADS_CACHE_MB * 1024 * 1024)
+
+
+def _etag(filename: str, st: os.stat_result) -> str:
+    return hashlib.blake2b(f"{filename}:{st.st_size}:{st.st_mtime_ns}".encode(), digest_size=12).hexdigest()
+
+
+def _from_memory(data: bytes, mimetype: str, etag: str) -> Response:
+    resp = Response(data, mimetype=mimetype)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = CACHE_CONTROL
+    return resp.make_conditional(request, accept_ranges=True, complete_length=len(data))
+
+
+def send_upload(root: str, filename: str) -> Response:
+    cached = _hot.get(filename)
+    if cached is not None:
+        data, (etag, mimetype) = cached
+        return _from_memory(data, mimetype, etag)
+
+    path = safe_join(root, filename)
+    try:
+        st = os.stat(path) if path else None
+    except OSError:
+        st = None
+    if st is None or not os.path.isfile(path):
+        abort(404)
+    etag = _etag(filename, st)
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = CACHE_CONTROL
+        return resp
+
+    if Settings.UPLOADS_OFFLOAD in ("x-accel", "x-sendfile"):
+        # El proxy envía el archivo (con Range y condicionales); el worker sólo arma cabeceras.
+        resp = Response(mimetype=mimetype)
+        if Settings.UPLOADS_OFFLOAD == "x-accel":
+            resp.headers["X-Accel-Redirect"] = Settings.UPLOADS_ACCEL_PREFIX.rstrip("/") + "/" + filename
+        else:
+            resp.headers["X-Sendfile"] = os.path.abspath(path)
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = CACHE_CONTROL
+        return resp
+
+    if st.st_size <= Settings.UPLOADS_CACHE_MAX_FILE_KB * 1024:
+        with open(path, "rb") as fh:
+            data = fh.read()
+        _hot.set(filename, data, (etag, mimetype))
+        return _from_memory(data, mimetype, etag)
+
+    resp = send_file(path, mimetype=mimetype, etag=etag, conditional=True, max_age=None)
+    resp.headers["Cache-Control"] = CACHE_CONTROL
+    return resp
+
+
+def hot_cache_stats() -> dict:
+    return _hot.stats()
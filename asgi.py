@@ -0,0 +1,7 @@
+from app import create_app
+from app.aio import AsgiApp
+
+# uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+# Sostiene sin hilo las conexiones ociosas y los streams SSE; los requests en curso (todos los
+# que tocan la BD) siguen acotados por ASGI_THREADS por proceso. Ver DOCKER_DEPLOYMENT.md.
+app = AsgiApp(create_app())
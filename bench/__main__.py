@@ -0,0 +1,70 @@
+"""Benchmark reproducible de la API.
+
+    python -m bench run --users 5000 --concurrency 16 --iterations 500 --out run.json
+    python -m bench run --db-url mysql+pymysql://u:p@127.0.0.1:3307/nexo_bench
+    python -m bench compare base.json run.json
+    python -m bench startup --runs 5 --out startup.json
+    python -m bench compare startup-base.json startup.json --metric private_kb
+
+Siembra una BD vacía (SQLite temporal por defecto) con un grafo de amistades de ley de
+potencias y recorre cada endpoint con ``create_app()`` desde varios hilos. La salida es JSON
+con p50/p95/p99, throughput y sentencias SQL por request de cada operación.
+
+``startup`` mide el arranque: ``-X importtime`` de ``wsgi`` y, por worker, tiempo hasta
+atender el primer request y memoria (RSS/PSS/privada) en frío y forkeado desde un master
+con la app precargada (``preload_app`` de gunicorn).
+"""
+import argparse, json, os, sys, tempfile
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    run_p = sub.add_parser("run", help="sembrar la BD y medir los endpoints")
+    run_p.add_argument("--db-url", help="URL SQLAlchemy de una BD vacía (por defecto SQLite temporal)")
+    run_p.add_argument("--users", type=int, default=2000)
+    run_p.add_argument("--concurrency", type=int, default=8)
+    run_p.add_argument("--iterations", type=int, default=300, help="iteraciones por escenario")
+    run_p.add_argument("--seed", type=int, default=42)
+    run_p.add_argument("--fast-hash", action="store_true", help="Argon2 barato (no mide el costo real de login)")
+    run_p.add_argument("--out", help="archivo JSON de salida (por defecto stdout)")
+
+    st_p = sub.add_parser("startup", help="medir imports y arranque de workers")
+    st_p.add_argument("--runs", type=int, default=5)
+    st_p.add_argument("--out", help="archivo JSON de salida (por defecto stdout)")
+
+    cmp_p = sub.add_parser("compare", help="comparar dos corridas")
+    cmp_p.add_argument("baseline")
+    cmp_p.add_argument("candidate")
+    cmp_p.add_argument("--metric", default="p95_ms")
+
+    args = parser.parse_args(argv)
+    from bench.runner import run, compare
+
+    if args.cmd in ("run", "startup"):
+        if args.cmd == "run":
+            db_url = args.db_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='nexo-bench-'), 'bench.db')}"
+            report = run(db_url, args.users, args.concurrency, args.iterations, args.seed, args.fast_hash)
+        else:
+            from bench.startup import run as run_startup
+            report = run_startup(args.runs)
+        text = json.dumps(report, indent=2, ensure_ascii=False)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as fh:
+                fh.write(text + "\n")
+        else:
+            print(text)
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as fh:
+        base = json.load(fh)
+    with open(args.candidate, encoding="utf-8") as fh:
+        cand = json.load(fh)
+    for op, b, c, delta in compare(base, cand, args.metric):
+        print(f"{op:20s} {b:10.3f} -> {c:10.3f} {args.metric}  ({delta:+.1f}%)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
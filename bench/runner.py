@@ -0,0 +1,164 @@
+import os, time, random, threading, platform, datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import event
+
+PASSWORD = "Bench!2025a"
+
+
+def configure(db_url: str, fast_hash: bool) -> None:
+    """Apunta la app a la BD del benchmark; debe correr antes de importar ``app``."""
+    if fast_hash:
+        os.environ.update(ARGON2_TIME_COST="1", ARGON2_MEMORY_COST_KIB="1024", ARGON2_PARALLELISM="1")
+    import config
+    config.Settings.SQLALCHEMY_DATABASE_URI = db_url
+    config.Settings.DB_REPLICA_URIS = []
+    # Todas las solicitudes salen de la misma IP; el limitador de /auth falsearía la medición.
+    config.Settings.RATE_LIMIT_ENABLED = False
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = max(int(round(p / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(k, len(sorted_values) - 1)]
+
+
+class Bench:
+    def __init__(self, app, engine, users: list[dict], rng: random.Random, concurrency: int):
+        self.app = app
+        self.users = users
+        self.rng = rng
+        self.concurrency = concurrency
+        self.tokens: list[tuple[dict, dict]] = []
+        self._local = threading.local()
+        event.listen(engine, "after_cursor_execute", self._count_sql)
+
+    def _count_sql(self, *args):
+        self._local.sql = getattr(self._local, "sql", 0) + 1
+
+    def _client(self):
+        if not hasattr(self._local, "client"):
+            self._local.client = self.app.test_client()
+        return self._local.client
+
+    def call(self, method: str, path: str, **kwargs):
+        self._local.sql = 0
+        start = time.perf_counter()
+        resp = self._client().open(path, method=method, **kwargs)
+        return resp, time.perf_counter() - start, self._local.sql
+
+    def login(self, user: dict):
+        return self.call("POST", "/auth/login", json={"email": user["email"], "password": PASSWORD})
+
+    def warm_up(self, n_tokens: int) -> None:
+        for user in self.rng.sample(self.users, min(n_tokens, len(self.users))):
+            resp, _, _ = self.login(user)
+            self.tokens.append((user, {"Authorization": "Bearer " + resp.get_json()["access_token"]}))
+
+    # Cada escenario devuelve una lista de (nombre, status, segundos, sentencias SQL).
+
+    def sc_login(self, rng):
+        resp, t, n = self.login(rng.choice(self.users))
+        return [("auth.login", resp.status_code, t, n)]
+
+    def sc_me(self, rng):
+        _, h = rng.choice(self.tokens)
+        resp, t, n = self.call("GET", "/users/me", headers=h)
+        return [("users.me", resp.status_code, t, n)]
+
+    def sc_search(self, rng):
+        q = rng.choice(self.users)["nombre"][:rng.randint(2, 5)]
+        resp, t, n = self.call("GET", "/users/search", query_string={"q": q, "limit": 20})
+        return [("users.search", resp.status_code, t, n)]
+
+    def sc_public(self, rng):
+        resp, t, n = self.call("GET", f"/users/{rng.choice(self.users)['user_uuid']}")
+        return [("users.public", resp.status_code, t, n)]
+
+    def sc_friends(self, rng):
+        _, h = rng.choice(self.tokens)
+        resp, t, n = self.call("GET", "/friends", query_string={"limit": 50}, headers=h)
+        return [("friends.list", resp.status_code, t, n)]
+
+    def sc_transitions(self, rng):
+        (a, ha), (b, hb) = rng.sample(self.tokens, 2)
+        out = []
+        for name, path, body, h in (
+            ("friends.request", "/friends/request", {"to_user_uuid": b["user_uuid"]}, ha),
+            ("friends.accept", "/friends/accept", {"user_uuid": a["user_uuid"]}, hb),
+            ("friends.unfriend", "/friends/unfriend", {"user_uuid": b["user_uuid"]}, ha),
+        ):
+            resp, t, n = self.call("POST", path, json=body, headers=h)
+            out.append((name, resp.status_code, t, n))
+        return out
+
+    SCENARIOS = ("sc_login", "sc_me", "sc_search", "sc_public", "sc_friends", "sc_transitions")
+
+    def run_scenario(self, name: str, iterations: int, seed: int) -> dict:
+        fn = getattr(self, name)
+        seeds = [seed * 1_000_003 + i for i in range(iterations)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(self.concurrency) as ex:
+            batches = list(ex.map(lambda s: fn(random.Random(s)), seeds))
+        wall = time.perf_counter() - start
+
+        samples: dict[str, list] = {}
+        for batch in batches:
+            for op, status, secs, sql in batch:
+                samples.setdefault(op, []).append((status, secs, sql))
+        results = {}
+        for op, rows in samples.items():
+            lat = sorted(s for _, s, _ in rows)
+            results[op] = {
+                "count": len(rows),
+                "errors": sum(1 for st, _, _ in rows if st >= 500),
+                "p50_ms": round(percentile(lat, 50) * 1000, 3),
+                "p95_ms": round(percentile(lat, 95) * 1000, 3),
+                "p99_ms": round(percentile(lat, 99) * 1000, 3),
+                "mean_ms": round(sum(lat) / len(lat) * 1000, 3),
+                "throughput_rps": round(len(rows) / wall, 2),
+                "sql_per_request": round(sum(q for _, _, q in rows) / len(rows), 2),
+            }
+        return results
+
+
+def run(db_url: str, n_users: int, concurrency: int, iterations: int, seed: int, fast_hash: bool) -> dict:
+    configure(db_url, fast_hash)
+    from app import create_app
+    from app.extensions import Base, engine
+    from bench.seed import seed as seed_db
+
+    rng = random.Random(seed)
+    Base.metadata.create_all(engine)
+    seeded = seed_db(engine, n_users, rng, PASSWORD)
+    app = create_app()
+
+    bench = Bench(app, engine, seeded["users"], rng, concurrency)
+    bench.warm_up(min(200, n_users))
+    results = {}
+    for i, name in enumerate(Bench.SCENARIOS):
+        results.update(bench.run_scenario(name, iterations, seed + i))
+
+    return {
+        "meta": {
+            "db": engine.url.render_as_string(hide_password=True),
+            "users": n_users,
+            "friendships": seeded["friendships"],
+            "concurrency": concurrency,
+            "iterations": iterations,
+            "seed": seed,
+            "fast_hash": fast_hash,
+            "python": platform.python_version(),
+            "timestamp": dt.datetime.now(dt.timezone.utc).isoformat(),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, candidate: dict, metric: str = "p95_ms") -> list[tuple[str, float, float, float]]:
+    rows = []
+    for op, base in sorted(baseline["results"].items()):
+        cand = candidate["results"].get(op)
+        if cand and base.get(metric) and metric in cand:
+            rows.append((op, base[metric], cand[metric], (cand[metric] - base[metric]) / base[metric] * 100))
+    return rows
@@ -0,0 +1,84 @@
+import uuid, datetime as dt
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+FIRST = ["Ana", "Luis", "María", "José", "Camila", "Andrés", "Valentina", "Juan", "Sofía", "Carlos",
+         "Isabella", "Diego", "Lucía", "Mateo", "Paula", "Santiago", "Daniela", "Felipe", "Laura", "Tomás"]
+LAST = ["García", "Rodríguez", "Martínez", "López", "González", "Pérez", "Sánchez", "Ramírez", "Torres",
+        "Flores", "Rivera", "Gómez", "Díaz", "Cruz", "Morales", "Ortiz", "Gutiérrez", "Castro", "Vargas", "Rojas"]
+CHUNK = 1000
+
+
+def _chunks(rows, size=CHUNK):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def power_law_pairs(n: int, rng, alpha: float = 1.6, attach: float = 0.75, max_degree: int = 2000) -> set[tuple[int, int]]:
+    """Pares (low, high) de índices 0..n-1 con grados de cola pesada (preferential attachment)."""
+    pairs: set[tuple[int, int]] = set()
+    endpoints: list[int] = []
+    for i in range(1, n):
+        degree = min(int(rng.paretovariate(alpha)), max_degree, i)
+        for _ in range(degree):
+            j = rng.choice(endpoints) if endpoints and rng.random() < attach else rng.randrange(i)
+            if j == i:
+                continue
+            pair = (j, i) if j < i else (i, j)
+            if pair not in pairs:
+                pairs.add(pair)
+                endpoints += pair
+    return pairs
+
+
+def seed(engine, n_users: int, rng, password: str) -> dict:
+    """Inserta usuarios, credenciales, índice de búsqueda, amistades y contadores en bloque."""
+    from app.models import User, AuthLocal, Friendship, UserSearchTerm
+    from app.search import build_terms
+    from app.counters import recompute
+    from app.security import hash_password
+
+    password_hash = hash_password(password)
+    users = [{
+        "user_uuid": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "nombre": rng.choice(FIRST),
+        "apellido": rng.choice(LAST),
+        "username": f"bench{i}",
+        "fecha_nacimiento": dt.date(1990, 1, 1),
+    } for i in range(n_users)]
+
+    with engine.begin() as conn:
+        for chunk in _chunks(users):
+            conn.execute(insert(User.__table__), chunk)
+        ids = dict(conn.execute(select(User.username, User.id).where(User.username.like("bench%"))).all())
+        for u in users:
+            u["id"] = ids[u["username"]]
+            u["email"] = f"{u['username']}@bench.local"
+        for chunk in _chunks(users):
+            conn.execute(insert(AuthLocal.__table__), [
+                {"user_id": u["id"], "email": u["email"], "password_hash": password_hash} for u in chunk
+            ])
+            conn.execute(insert(UserSearchTerm.__table__), [
+                t for u in chunk for t in build_terms(u["id"], u["nombre"], u["apellido"], u["username"], u["email"])
+            ])
+
+        pairs = power_law_pairs(n_users, rng)
+        rows = []
+        for a, b in pairs:
+            low, high = users[a]["id"], users[b]["id"]
+            low, high = min(low, high), max(low, high)
+            accepted = rng.random() < 0.8
+            rows.append({
+                "user_low_id": low, "user_high_id": high,
+                "status": "accepted" if accepted else "pending",
+                "requested_by_id": rng.choice((low, high)),
+            })
+        for chunk in _chunks(rows):
+            conn.execute(insert(Friendship.__table__), chunk)
+
+    with Session(engine) as db:
+        for chunk in _chunks([u["id"] for u in users]):
+            recompute(db, chunk)
+        db.commit()
+
+    return {"users": users, "friendships": len(rows)}
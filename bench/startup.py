@@ -0,0 +1,122 @@
+import os, sys, gc, json, time, platform, statistics, subprocess, datetime as dt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Worker sin preload: intérprete nuevo que importa la app y atiende un request.
+_COLD = """
+import sys, time, json
+t0 = float(sys.argv[1])
+import wsgi
+wsgi.app.test_client().get("/health")
+from bench.startup import memory
+print(json.dumps({"ready_ms": (time.time() - t0) * 1000, **memory()}))
+"""
+
+
+def memory() -> dict:
+    """RSS, PSS y memoria privada del proceso actual en KiB (Linux, smaps_rollup)."""
+    fields = {}
+    try:
+        with open("/proc/self/smaps_rollup") as fh:
+            for line in fh:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1])
+    except OSError:
+        return {}
+    return {
+        "rss_kb": fields.get("Rss", 0),
+        "pss_kb": fields.get("Pss", 0),
+        "private_kb": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """Líneas de ``-X importtime`` como ``(módulo, self_us, acumulado_us, profundidad)``."""
+    out = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        out.append((name.strip(), int(self_us), int(cum_us), (len(name) - len(name.lstrip()) - 1) // 2))
+    return out
+
+
+def _env() -> dict:
+    # Settings arma la URI aunque no haya BD: ningún paso del arranque abre conexiones.
+    return dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+
+
+def import_profile(runs: int, top: int = 15) -> dict:
+    walls, last = [], ""
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import wsgi"],
+                              cwd=ROOT, env=_env(), capture_output=True, text=True, check=True)
+        walls.append((time.perf_counter() - start) * 1000)
+        last = proc.stderr
+    rows = parse_importtime(last)
+    total = sum(cum for _, _, cum, depth in rows if depth == 0)
+    return {
+        "wall_ms": round(statistics.median(walls), 1),
+        "import_ms": round(total / 1000, 1),
+        "top_cumulative": [(n, round(c / 1000, 2)) for n, _, c, d in sorted(rows, key=lambda r: -r[2]) if d <= 2][:top],
+        "top_self": [(n, round(s / 1000, 2)) for n, s, _, _ in sorted(rows, key=lambda r: -r[1])][:top],
+    }
+
+
+def cold_worker(runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-c", _COLD, repr(time.time())],
+                              cwd=ROOT, env=_env(), capture_output=True, text=True, check=True)
+        samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return _summary(samples)
+
+
+def forked_worker(runs: int) -> dict:
+    """Lo que hace gunicorn con preload: la app ya está armada y el worker nace por fork."""
+    sys.path.insert(0, ROOT)
+    import wsgi
+    from app import init_worker
+    gc.freeze()
+    samples = []
+    for _ in range(runs):
+        r, w = os.pipe()
+        start = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(r)
+            init_worker()
+            wsgi.app.test_client().get("/health")
+            os.write(w, json.dumps(memory()).encode())
+            os._exit(0)
+        os.close(w)
+        with os.fdopen(r) as fh:
+            sample = json.loads(fh.read())
+        sample["ready_ms"] = (time.perf_counter() - start) * 1000
+        os.waitpid(pid, 0)
+        samples.append(sample)
+    return _summary(samples)
+
+
+def _summary(samples: list[dict]) -> dict:
+    return {k: round(statistics.median(s[k] for s in samples), 1) for k in samples[0]}
+
+
+def run(runs: int) -> dict:
+    imports = import_profile(runs)
+    return {
+        "meta": {
+            "runs": runs,
+            "python": platform.python_version(),
+            "timestamp": dt.datetime.now(dt.timezone.utc).isoformat(),
+        },
+        "results": {
+            "import.wsgi": {"wall_ms": imports["wall_ms"], "import_ms": imports["import_ms"]},
+            "worker.cold": cold_worker(runs),
+            "worker.forked": forked_worker(runs),
+        },
+        "top_cumulative": imports["top_cumulative"],
+        "top_self": imports["top_self"],
+    }
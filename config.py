@@ -1,4 +1,11 @@
-import os
+import os, tempfile
+
+
+def _rate(value: str) -> tuple[int, float]:
+    # "N/S": ráfaga de N solicitudes que se recarga a N por cada S segundos.
+    n, s = value.split("/")
+    return int(n), float(s)
+
 
 class Settings:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev")
@@ -9,13 +16,102 @@ class Settings:
         f"/{os.getenv('MYSQL_DB')}?charset=utf8mb4"
     )
 
+    # Hilos que ejecutan vistas Flask en modo ASGI (asgi.py): tope de requests en curso por proceso.
+    # El pool de la BD debe acompañarlo.
+    ASGI_THREADS = int(os.getenv("ASGI_THREADS", "64"))
+
     SQLALCHEMY_ECHO = False
 
+    # Pool por proceso/worker. En modo ASGI conviene DB_POOL_SIZE + DB_MAX_OVERFLOW >= ASGI_THREADS.
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_RECYCLE_S = int(os.getenv("DB_POOL_RECYCLE_S", "1800"))
+    DB_POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "30"))
+    # URIs de réplicas de lectura separadas por coma; vacío = todo va al primario.
+    DB_REPLICA_URIS = [u for u in os.getenv("DB_REPLICA_URIS", "").split(",") if u]
+    DB_REPLICA_RETRY_S = float(os.getenv("DB_REPLICA_RETRY_S", "30"))
+
+    # "orjson" (si está instalado) o "default" (json de la stdlib vía Flask).
+    JSON_PROVIDER = os.getenv("JSON_PROVIDER", "orjson")
+
     CORS_ORIGINS = os.getenv("CORS_ORIGINS","*").split(",")
 
     JWT_SECRET = os.getenv("JWT_SECRET", "dev")
     JWT_EXPIRES_MIN = int(os.getenv("JWT_EXPIRES_MIN", "15"))
+    REFRESH_EXPIRES_DAYS = int(os.getenv("REFRESH_EXPIRES_DAYS", "30"))
+    # Cada cuánto un worker trae las revocaciones hechas por otros workers.
+    REVOCATION_SYNC_S = float(os.getenv("REVOCATION_SYNC_S", "2"))
+    # Margen de las sincronizaciones incrementales por timestamp para transacciones que confirman
+    # después de fijarlo: cada pasada relee esa ventana.
+    SYNC_SKEW_S = int(os.getenv("SYNC_SKEW_S", "5"))
+    # Filtro de usernames/emails ocupados de GET /auth/availability.
+    AVAILABILITY_SYNC_S = float(os.getenv("AVAILABILITY_SYNC_S", "2"))
+    AVAILABILITY_REBUILD_S = float(os.getenv("AVAILABILITY_REBUILD_S", "600"))
+    TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+    PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+    PRINCIPAL_CACHE_TTL_S = int(os.getenv("PRINCIPAL_CACHE_TTL_S", "60"))
+    PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "50000"))
+    PROFILE_CACHE_TTL_S = int(os.getenv("PROFILE_CACHE_TTL_S", "30"))
+    PROFILE_BATCH_MAX = int(os.getenv("PROFILE_BATCH_MAX", "300"))
+    # Coincidencias más nuevas que /users/search rankea y pagina; acota el costo de cada página.
+    SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "1000"))
+    FRIEND_GRAPH_SYNC_S = float(os.getenv("FRIEND_GRAPH_SYNC_S", "5"))
+    FRIENDS_BATCH_MAX = int(os.getenv("FRIENDS_BATCH_MAX", "500"))
+    # Margen de GET /friends?since= para transacciones que confirman después de fijar updated_at.
+    FRIENDS_SYNC_SKEW_S = int(os.getenv("FRIENDS_SYNC_SKEW_S", "5"))
+
+    # Log local de transiciones de amistad del que leen los streams SSE de todos los workers.
+    FRIEND_EVENTS_FILE = os.getenv(
+        "FRIEND_EVENTS_FILE",
+        os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "nexo-friend-events.log"),
+    )
+    FRIEND_EVENTS_MAX_MB = int(os.getenv("FRIEND_EVENTS_MAX_MB", "16"))
+    FRIEND_EVENTS_QUEUE = int(os.getenv("FRIEND_EVENTS_QUEUE", "256"))
+    FRIEND_EVENTS_POLL_S = float(os.getenv("FRIEND_EVENTS_POLL_S", "0.2"))
+    FRIEND_EVENTS_HEARTBEAT_S = float(os.getenv("FRIEND_EVENTS_HEARTBEAT_S", "15"))
+    # En WSGI no se retiene el worker: la respuesta se cierra y el cliente se reconecta tras este lapso.
+    FRIEND_EVENTS_WSGI_RETRY_MS = int(os.getenv("FRIEND_EVENTS_WSGI_RETRY_MS", "5000"))
+
+    # Token buckets por ruta y clave (ip / email normalizado), compartidos por todos los workers.
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") not in ("0", "false", "False", "")
+    RATE_LIMIT_FILE = os.getenv(
+        "RATE_LIMIT_FILE",
+        os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "nexo-ratelimit"),
+    )
+    RATE_LIMIT_SLOTS = int(os.getenv("RATE_LIMIT_SLOTS", "65536"))
+    RATE_LIMITS = {
+        "auth.login": {
+            "ip": _rate(os.getenv("RATE_LIMIT_LOGIN_IP", "30/60")),
+            "email": _rate(os.getenv("RATE_LIMIT_LOGIN_EMAIL", "5/60")),
+        },
+        "auth.register": {
+            "ip": _rate(os.getenv("RATE_LIMIT_REGISTER_IP", "10/600")),
+            "email": _rate(os.getenv("RATE_LIMIT_REGISTER_EMAIL", "3/600")),
+        },
+        "auth.availability": {
+            "ip": _rate(os.getenv("RATE_LIMIT_AVAILABILITY_IP", "60/60")),
+        },
+    }
+    # Proxies delante de la app (nginx, Caprover); con 0 se usa la IP del socket.
+    PROXY_HOPS = int(os.getenv("PROXY_HOPS", "0"))
 
     UPLOAD_ROOT = os.getenv("UPLOAD_ROOT", "uploads")
 
     MAX_AVATAR_MB = int(os.getenv("MAX_AVATAR_MB", "2"))
+    AVATAR_SIZES = sorted(int(s) for s in os.getenv("AVATAR_SIZES", "64,128,512").split(","))
+    AVATAR_WORKERS = int(os.getenv("AVATAR_WORKERS", "2"))
+
+    # "" = sirve Python; "x-accel" (nginx) o "x-sendfile" (apache/lighttpd) delegan el envío.
+    UPLOADS_OFFLOAD = os.getenv("UPLOADS_OFFLOAD", "")
+    UPLOADS_ACCEL_PREFIX = os.getenv("UPLOADS_ACCEL_PREFIX", "/protected-uploads/")
+    UPLOADS_CACHE_MB = int(os.getenv("UPLOADS_CACHE_MB", "32"))
+    UPLOADS_CACHE_MAX_FILE_KB = int(os.getenv("UPLOADS_CACHE_MAX_FILE_KB", "256"))
+
+    ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+    ARGON2_MEMORY_COST_KIB = int(os.getenv("ARGON2_MEMORY_COST_KIB", "65536"))
+    ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+    # 0 workers = hashing en el hilo del request (sigue acotado por PASSWORD_MAX_PENDING).
+    PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", "2"))
+    PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", "16"))
+    PASSWORD_TIMEOUT_S = float(os.getenv("PASSWORD_TIMEOUT_S", "10"))
@@ -0,0 +1,39 @@
+import gc, os
+
+# Con preload el master importa y arma la app una sola vez; los workers la heredan por fork
+# (arranque inmediato y páginas compartidas copy-on-write) y rearman sus pools en post_fork.
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") not in ("0", "false", "False", "")
+
+
+def when_ready(server):
+    # El filtro de disponibilidad se arma una vez en el master; si la BD no responde, cada
+    # worker lo arma en su primera consulta.
+    if server.cfg.preload_app:
+        from app.availability import taken
+        from app.extensions import engine
+        try:
+            taken.warm()
+        except Exception as e:
+            server.log.warning("No se pudo armar el filtro de disponibilidad: %s", e)
+        # El master no atiende requests: no conserva la conexión usada para armarlo.
+        engine.dispose()
+
+
+def pre_fork(server, worker):
+    # Lo cargado en el master pasa a la generación permanente: el GC de cada worker no lo recorre
+    # ni escribe sus cabeceras, así esas páginas siguen compartidas.
+    if server.cfg.preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from app import init_worker
+        init_worker()
+
+
+def child_exit(server, worker):
+    # Libera los archivos mmap de métricas del worker que terminó.
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
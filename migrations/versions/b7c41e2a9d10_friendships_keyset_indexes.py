@@ -0,0 +1,30 @@
+"""friendships keyset indexes
+
+Revision ID: b7c41e2a9d10
+Revises: e30259f11abc
+Create Date: 2026-10-18 09:12:40.114201
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c41e2a9d10'
+down_revision: Union[str, Sequence[str], None] = 'e30259f11abc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_friendships_low_updated', 'friendships', ['user_low_id', 'updated_at', 'id'], unique=False)
+    op.create_index('ix_friendships_high_updated', 'friendships', ['user_high_id', 'updated_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_friendships_high_updated', table_name='friendships')
+    op.drop_index('ix_friendships_low_updated', table_name='friendships')
@@ -0,0 +1,63 @@
+"""user search terms
+
+Revision ID: c58f03d1e6a7
+Revises: b7c41e2a9d10
+Create Date: 2026-10-18 10:02:11.540877
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+from app.search import build_terms
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c58f03d1e6a7'
+down_revision: Union[str, Sequence[str], None] = 'b7c41e2a9d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_search_terms',
+    sa.Column('term', sa.String(length=8).with_variant(mysql.VARCHAR(8, collation='utf8mb4_bin'), 'mysql'), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('weight', sa.SmallInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('term', 'user_id')
+    )
+    op.create_index(op.f('ix_user_search_terms_user_id'), 'user_search_terms', ['user_id'], unique=False)
+    _backfill()
+
+
+def _backfill(batch_size: int = 1000) -> None:
+    """Indexa los usuarios existentes; sin esto no aparecen en /users/search."""
+    users = sa.table('users', sa.column('id'), sa.column('nombre'), sa.column('apellido'), sa.column('username'))
+    auth = sa.table('auth_local', sa.column('user_id'), sa.column('email'))
+    terms = sa.table('user_search_terms', sa.column('term'), sa.column('user_id'), sa.column('weight'))
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(users.c.id, users.c.nombre, users.c.apellido, users.c.username, auth.c.email)
+            .select_from(users.outerjoin(auth, auth.c.user_id == users.c.id))
+            .where(users.c.id > last_id)
+            .order_by(users.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        batch = [t for r in rows for t in build_terms(r.id, r.nombre, r.apellido, r.username, r.email)]
+        if batch:
+            bind.execute(terms.insert(), batch)
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_user_search_terms_user_id'), table_name='user_search_terms')
+    op.drop_table('user_search_terms')
@@ -0,0 +1,30 @@
+"""users/auth_local updated_at indexes
+
+Revision ID: c6d1f08a2e94
+Revises: b94e2f6d0c18
+Create Date: 2026-10-18 17:05:12.418337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6d1f08a2e94'
+down_revision: Union[str, Sequence[str], None] = 'b94e2f6d0c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_updated_at', 'users', ['updated_at'], unique=False)
+    op.create_index('ix_auth_local_updated_at', 'auth_local', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_auth_local_updated_at', table_name='auth_local')
+    op.drop_index('ix_users_updated_at', table_name='users')
@@ -0,0 +1,28 @@
+"""users created_at/id index
+
+Revision ID: d2a9e6b4c713
+Revises: c58f03d1e6a7
+Create Date: 2026-10-18 10:48:57.302415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a9e6b4c713'
+down_revision: Union[str, Sequence[str], None] = 'c58f03d1e6a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_created_id', 'users', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_created_id', table_name='users')
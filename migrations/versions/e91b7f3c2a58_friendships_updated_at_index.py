@@ -0,0 +1,28 @@
+"""friendships updated_at index
+
+Revision ID: e91b7f3c2a58
+Revises: d2a9e6b4c713
+Create Date: 2026-10-18 12:21:05.876310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e91b7f3c2a58'
+down_revision: Union[str, Sequence[str], None] = 'd2a9e6b4c713'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_friendships_updated_at', 'friendships', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_friendships_updated_at', table_name='friendships')
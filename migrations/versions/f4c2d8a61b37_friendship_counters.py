@@ -0,0 +1,56 @@
+"""friendship counters
+
+Revision ID: f4c2d8a61b37
+Revises: e91b7f3c2a58
+Create Date: 2026-10-18 13:05:44.918263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c2d8a61b37'
+down_revision: Union[str, Sequence[str], None] = 'e91b7f3c2a58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('friendship_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('accepted', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('incoming_pending', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('outgoing_pending', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Valores reales desde friendships (cada par cuenta para ambos lados), mismas reglas que
+    # app.counters.recompute; después, una fila en cero para quien no tiene ninguna amistad.
+    op.execute("""
+        INSERT INTO friendship_counters (user_id, accepted, incoming_pending, outgoing_pending)
+        SELECT s.uid,
+               SUM(CASE WHEN s.status = 'accepted' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN s.status = 'pending' AND s.requested_by_id = s.uid THEN 0
+                        WHEN s.status = 'pending' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN s.status = 'pending' AND s.requested_by_id = s.uid THEN 1 ELSE 0 END)
+        FROM (SELECT user_low_id AS uid, status, requested_by_id FROM friendships
+              UNION ALL
+              SELECT user_high_id AS uid, status, requested_by_id FROM friendships) s
+        JOIN users u ON u.id = s.uid
+        GROUP BY s.uid
+    """)
+    op.execute("""
+        INSERT INTO friendship_counters (user_id)
+        SELECT u.id FROM users u
+        LEFT JOIN friendship_counters c ON c.user_id = u.id
+        WHERE c.user_id IS NULL
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('friendship_counters')